@@ -0,0 +1,317 @@
+"""
+Background Telegram alert dispatcher.
+
+enqueue() stores an alert in a persistent SQLite outbox and returns at once. A
+background worker coalesces pending alerts per chat within a short window,
+splits them at Telegram's 4096-character limit, and sends them while
+respecting per-chat and global token buckets. Failed sends are retried with
+exponential backoff, honouring 429 retry_after; only the alerts in the failed
+message count an attempt, and the chunks of a split alert already delivered
+are not sent again. Undelivered alerts survive restarts and are sent when the
+next worker starts.
+"""
+import os
+import time
+import sqlite3
+import threading
+import requests
+from http_client import get_session
+import metrics
+
+OUTBOX_PATH = os.getenv("TELEGRAM_OUTBOX_PATH", "telegram_outbox.db")
+MAX_MESSAGE_LENGTH = 4096
+# Seconds to wait for more alerts to the same chat before sending
+COALESCE_WINDOW = float(os.getenv("TELEGRAM_COALESCE_WINDOW", "2"))
+# Telegram limits: about one message per second per chat, 30 per second overall
+PER_CHAT_RATE, PER_CHAT_BURST = 1.0, 3
+GLOBAL_RATE, GLOBAL_BURST = 30.0, 30
+MAX_ATTEMPTS = 8
+MAX_BACKOFF = 300
+# A claim older than this is considered abandoned by a dead worker
+CLAIM_TIMEOUT = 120
+REQUEST_TIMEOUT = (3.05, 10)
+
+_conn = None
+_db_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Simple token bucket; wait_time() is the delay before take() is allowed."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(OUTBOX_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " chat_id TEXT NOT NULL, text TEXT NOT NULL, parse_mode TEXT,"
+            " created_at REAL NOT NULL, next_attempt_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " claimed_by TEXT, claimed_at REAL,"
+            " chunks_sent INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(outbox)")}
+        if "chunks_sent" not in columns:
+            # Outboxes created before split alerts could resume part-way
+            conn.execute("ALTER TABLE outbox ADD COLUMN chunks_sent INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def enqueue(text: str, chat_id: str, parse_mode: str = "Markdown"):
+    """Persist an alert for background delivery and return immediately."""
+    now = time.time()
+    with _db_lock:
+        conn = _get_conn()
+        conn.execute(
+            "INSERT INTO outbox (chat_id, text, parse_mode, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+            (str(chat_id), text, parse_mode, now, now),
+        )
+        conn.commit()
+    start()
+    _wakeup.set()
+
+
+def pending_count() -> int:
+    """Number of alerts not yet delivered (excluding ones that gave up)."""
+    with _db_lock:
+        (count,) = _get_conn().execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()
+    return count
+
+
+def flush(timeout: float = 30) -> bool:
+    """Wait until the outbox is empty or the timeout passes. Returns True if empty."""
+    start()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pending_count() == 0:
+            return True
+        _wakeup.set()
+        time.sleep(0.2)
+    return pending_count() == 0
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list:
+    """Split text into chunks of at most limit characters, preferring line breaks."""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def _claim_due(worker_id: str):
+    """Claim all due pending alerts for this worker; returns rows grouped by chat."""
+    now = time.time()
+    with _db_lock:
+        conn = _get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, chat_id, text, parse_mode, created_at, attempts, chunks_sent FROM outbox"
+                " WHERE status = 'pending' AND next_attempt_at <= ?"
+                " AND (claimed_by IS NULL OR claimed_at < ?) ORDER BY id",
+                (now, now - CLAIM_TIMEOUT),
+            ).fetchall()
+            # Hold back chats whose newest alert is still inside the coalescing window
+            newest = {}
+            for row in rows:
+                newest[row[1]] = max(newest.get(row[1], 0), row[4])
+            rows = [r for r in rows if now - newest[r[1]] >= COALESCE_WINDOW]
+            conn.executemany(
+                "UPDATE outbox SET claimed_by = ?, claimed_at = ? WHERE id = ?",
+                [(worker_id, now, r[0]) for r in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    by_chat = {}
+    for row in rows:
+        by_chat.setdefault(row[1], []).append(row)
+    return by_chat
+
+
+def _coalesce(rows):
+    """
+    Combine one chat's alerts into messages within the length limit. Returns a
+    list of (text, parse_mode, ids, chunk); a single oversized alert becomes
+    several messages sharing the same ids, numbered by chunk from 1 and
+    starting after the chunks already sent. chunk is None for other messages.
+    """
+    messages, current, ids, mode = [], "", [], None
+    for row_id, _, text, parse_mode, _, _, chunks_sent in rows:
+        if current and (parse_mode != mode or len(current) + 2 + len(text) > MAX_MESSAGE_LENGTH):
+            messages.append((current, mode, ids, None))
+            current, ids = "", []
+        if len(text) > MAX_MESSAGE_LENGTH:
+            for n, chunk in enumerate(split_message(text), start=1):
+                if n > chunks_sent:
+                    messages.append((chunk, parse_mode, [row_id], n))
+            continue
+        current = f"{current}\n\n{text}" if current else text
+        ids.append(row_id)
+        mode = parse_mode
+    if current:
+        messages.append((current, mode, ids, None))
+    return messages
+
+
+def _post(token: str, chat_id: str, text: str, parse_mode):
+    """Send one message; returns (ok, retry_after_seconds, permanent_failure)."""
+    url = f"{os.getenv('TELEGRAM_API_BASE', 'https://api.telegram.org')}/bot{token}/sendMessage"
+    payload = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    try:
+        with metrics.span("telegram_send"):
+            response = get_session().post(url, data=payload, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        metrics.inc("telegram_messages_total", outcome="network_error")
+        print(f"Error sending Telegram message: {e}")
+        return False, None, False
+    metrics.inc("telegram_messages_total", outcome="sent" if response.ok else str(response.status_code))
+    if response.ok:
+        return True, None, False
+    retry_after = None
+    try:
+        retry_after = response.json().get("parameters", {}).get("retry_after")
+    except ValueError:
+        pass
+    if response.status_code == 400 and parse_mode:
+        # Usually unbalanced Markdown in a headline; send it as plain text instead
+        return _post(token, chat_id, text, None)
+    print(f"Failed to send Telegram message: {response.status_code} - {response.text}")
+    permanent = response.status_code in (400, 401, 403, 404)
+    return False, retry_after, permanent
+
+
+def _finish(ids, ok, retry_after=None, permanent=False) -> float:
+    """
+    Delete delivered alerts, or count a failed attempt and release them for a
+    later retry. Returns the time the last of them is due again (now if none is).
+    """
+    now = time.time()
+    due = now
+    with _db_lock:
+        conn = _get_conn()
+        if ok:
+            conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+        else:
+            for i in ids:
+                (attempts,) = conn.execute("SELECT attempts FROM outbox WHERE id = ?", (i,)).fetchone() or (0,)
+                attempts += 1
+                delay = retry_after if retry_after else min(2 ** attempts, MAX_BACKOFF)
+                status = "failed" if permanent or attempts >= MAX_ATTEMPTS else "pending"
+                if status == "pending":
+                    due = max(due, now + delay)
+                conn.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ?, status = ?,"
+                    " claimed_by = NULL, claimed_at = NULL WHERE id = ?",
+                    (attempts, now + delay, status, i),
+                )
+        conn.commit()
+    return due
+
+
+def _release(ids, not_before: float):
+    """Unclaim alerts that were not tried, without counting an attempt."""
+    with _db_lock:
+        conn = _get_conn()
+        conn.executemany(
+            "UPDATE outbox SET next_attempt_at = MAX(next_attempt_at, ?),"
+            " claimed_by = NULL, claimed_at = NULL WHERE id = ?",
+            [(not_before, i) for i in ids],
+        )
+        conn.commit()
+
+
+def _mark_chunks(row_id, chunks_sent: int):
+    """Record how many chunks of a split alert were delivered, so a retry resumes after them."""
+    with _db_lock:
+        conn = _get_conn()
+        conn.execute("UPDATE outbox SET chunks_sent = ? WHERE id = ?", (chunks_sent, row_id))
+        conn.commit()
+
+
+def _run():
+    worker_id = f"{os.getpid()}-{threading.get_ident()}"
+    chat_buckets = {}
+    global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+    while True:
+        _wakeup.wait(timeout=COALESCE_WINDOW)
+        _wakeup.clear()
+        token = os.getenv("TELEGRAM_BOT_TOKEN")
+        if not token:
+            continue
+        try:
+            by_chat = _claim_due(worker_id)
+        except sqlite3.Error as e:
+            print(f"Telegram outbox unavailable: {e}")
+            continue
+        for chat_id, rows in by_chat.items():
+            bucket = chat_buckets.setdefault(chat_id, TokenBucket(PER_CHAT_RATE, PER_CHAT_BURST))
+            messages = _coalesce(rows)
+            for pos, (text, parse_mode, ids, chunk) in enumerate(messages):
+                time.sleep(max(bucket.wait_time(), global_bucket.wait_time()))
+                bucket.take()
+                global_bucket.take()
+                ok, retry_after, permanent = _post(token, chat_id, text, parse_mode)
+                later_ids = []
+                for _, _, rest, _ in messages[pos + 1:]:
+                    later_ids.extend(i for i in rest if i not in later_ids)
+                if ok:
+                    # Ids of a split alert are only finished with its last chunk
+                    done = [i for i in ids if i not in later_ids]
+                    if done:
+                        _finish(done, True)
+                    else:
+                        _mark_chunks(ids[0], chunk)
+                    continue
+                # Only the failed message counts an attempt; the later alerts
+                # wait until it is retried so the chat's order is kept
+                due = _finish(ids, False, retry_after, permanent)
+                _release([i for i in later_ids if i not in ids], due)
+                break
+
+
+def start():
+    """Start the background worker for this process if it is not running."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="telegram-dispatcher", daemon=True)
+            _worker.start()
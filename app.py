@@ -1,29 +1,28 @@
 import streamlit as st
-import yfinance as yf
-import json
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
 from news_fetcher import get_news, get_rss_news
-from summarizer import summarize
+from article_pipeline import summarize_articles
 from telegram_alerts import send_telegram_message
 from sentiment_logger import log_sentiment
 from sentiment_trends import plot_sentiment_trend
 from datetime import datetime, date
-from processed_store import is_processed, mark_processed
-
-def extract_sentiment_keyword(text: str) -> str:
-    """
-    Extract the primary sentiment keyword from the summary text.
-    """
-    lower = text.lower()
-    for kw in ('bullish', 'bearish', 'neutral'):
-        if kw in lower:
-            return kw
-    return 'unknown'
+from processed_store import filter_unprocessed, mark_processed
+from quotes import get_quote
+from newsapi_client import stats as newsapi_stats
+from ticker_matcher import get_matcher
+from ticker_metadata import get_company_name
+import ingest_store
+import market_events
+import metrics
+import ticker_list
+# Re-exported for callers that still import it from here
+from sentiment_utils import extract_sentiment_keyword, is_error_summary
 
 def get_gsheet_client():
+    # Google Sheets SDKs are slow to import and only needed here
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
     credentials = {
         "type": st.secrets["gspread"]["type"],
         "project_id": st.secrets["gspread"]["project_id"],
@@ -38,17 +37,19 @@ def get_gsheet_client():
     return gspread.authorize(creds)
 
 def load_tickers():
+    # Served from the shared ticker cache; the sheet is only read when the cache is stale
     try:
-        gc = get_gsheet_client()
-        sheet_id = st.secrets["gspread"]["sheet_id"]
-        sheet = gc.open_by_key(sheet_id)
-        worksheet = sheet.sheet1
-        values = worksheet.col_values(1)
-        tickers = [t.upper().strip() for t in values[1:] if t.strip()]
-        return list(set(tickers))
-    except Exception as e:
+        ticker_list.configure(get_gsheet_client, st.secrets["gspread"]["sheet_id"])
+        ticker_list.start_refresher()
+    except Exception:
+        pass  # no sheet credentials: use the local tickers.csv
+    tickers = ticker_list.get_tickers()
+    if not tickers:
         st.error("Error loading tickers. Showing fallback tickers.")
         return ["OKLO", "HOOD", "TSLA", "PLTR", "TEM"]
+    # Make sure the shared ticker matcher knows the whole watchlist
+    get_matcher().update(tickers)
+    return tickers
 
 
 
@@ -64,21 +65,158 @@ def add_ticker(new_ticker):
         return False, f"Invalid ticker format: {new_ticker}"
     
     try:
-        gc = get_gsheet_client()
-        sheet = gc.open_by_key(st.secrets["gspread"]["sheet_id"]).sheet1
-        existing = load_tickers()
-        
-        if new_ticker in existing:
+        # Written through to the sheet, the shared cache and tickers.csv
+        if not ticker_list.add_ticker(new_ticker):
             return False, f"Ticker {new_ticker} already in list"
-            
-        sheet.append_row([new_ticker])
+        # Extend the shared ticker matcher in place
+        get_matcher().add_ticker(new_ticker, get_company_name(new_ticker))
         return True, f"Added {new_ticker} successfully!"
     except Exception as e:
         return False, f"Error adding ticker: {str(e)}"
 
+def show_trend(ticker, source):
+    """Sentiment trend chart for the ticker from the source's log."""
+    st.subheader("📈 Sentiment Trend")
+    log_path = f"sentiment_log_{source.lower()}.csv"
+    fig = plot_sentiment_trend(log_path=log_path, ticker=ticker, source=source)
+    if fig:
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.write(f"No sentiment data to display for {source}.")
+
+def show_ingested(ticker):
+    """
+    Read-only view of what the ingestion daemon stored for the ticker, with its
+    freshness and a button that asks the daemon to poll again right away.
+    """
+    for tab, source in zip(st.tabs(["NewsAPI", "RSS"]), ("NewsAPI", "RSS")):
+        with tab:
+            info_col, btn_col = st.columns([3, 1])
+            info_col.caption(ingest_store.describe_freshness(ticker, source))
+            if btn_col.button("Refresh now", key=f"refresh_{source}"):
+                ingest_store.request_refresh(ticker, source)
+                st.info("Refresh requested; reload the page in a moment to see new articles.")
+            articles = ingest_store.recent_articles(ticker, source)
+            if not articles:
+                st.write(f"No articles ingested via {source} yet.")
+                continue
+            for article in articles:
+                st.markdown(f"### {article['title']}")
+                st.caption(f"{article['source']} • {article['publishedAt']}")
+                st.markdown(f"[🔗 Read full article]({article['url']})", unsafe_allow_html=True)
+                st.success(article["summary"])
+                if article["duplicate_of"]:
+                    st.caption(f"Same story as {article['duplicate_of']}")
+            show_trend(ticker, source)
+
+def fetch_and_show(selected_ticker):
+    """Fetch, summarize and log news inline, for when no ingestion daemon is running."""
+    col1, col2 = st.columns(2)
+    # Render both buttons and capture their clicks
+    newsapi_clicked = col1.button("Fetch via NewsAPI")
+    rss_clicked = col2.button("Fetch via RSS")
+    if newsapi_clicked:
+        articles = get_news(selected_ticker)
+        source = "NewsAPI"
+        # Out of NewsAPI quota, get_news returns RSS articles; log them as such
+        if articles and articles[0].get("via"):
+            source = articles[0]["via"]
+            st.info(f"NewsAPI quota exhausted; showing {source} articles instead.")
+    elif rss_clicked:
+        articles = get_rss_news(selected_ticker)
+        source = "RSS"
+    else:
+        articles = None
+        source = None
+
+    if articles is None:
+        st.write("Select a source to fetch news.")
+    elif not articles:
+        st.write(f"No articles found via {source}.")
+    else:
+        combined_lines = [f"📰 ${selected_ticker} ({source})", ""]
+        # Check the whole batch against the processed store in one lookup
+        new_urls = set(filter_unprocessed([a.get("url") for a in articles if a.get("url")], source))
+        # Reuse summaries of near-duplicate stories, classify locally where confident
+        # and summarize the rest concurrently, before rendering, keeping article order
+        summaries = summarize_articles(articles, selected_ticker, source)
+        for article, summary in zip(articles, summaries):
+            title = article.get("title", "No title")
+            url = article.get("url")
+            st.markdown(f"### {title}")
+            st.caption(f"{article.get('source','Unknown source')} • {article.get('publishedAt','')}")
+            if url:
+                st.markdown(f"[🔗 Read full article]({url})", unsafe_allow_html=True)
+            st.success(summary)
+            if article.get("duplicate_of"):
+                st.caption(f"Same story as {article['duplicate_of']}")
+            sentiment_key = extract_sentiment_keyword(summary)
+            pub_str = article.get("publishedAt", "")
+            # Only log and mark processed if this URL hasn't been seen for this source,
+            # and not when summarizing failed, so the next fetch retries it
+            if url and url in new_urls and not is_error_summary(summary):
+                try:
+                    pub_date = datetime.fromisoformat(pub_str.replace("Z", "")).date()
+                except Exception:
+                    pub_date = None
+                # Near-duplicates of an already logged story are not counted again
+                if not article.get("duplicate_of"):
+                    log_sentiment(selected_ticker, sentiment_key, source, log_date=pub_date)
+                    # Add to Telegram batch
+                    combined_lines.append(f"🔹 *{title}*  ")
+                    combined_lines.append(f"🧠 {sentiment_key}".strip())
+                    combined_lines.append("")  # blank line
+                # Mark this URL as processed to avoid duplicates
+                mark_processed(url, source, process_date=pub_date)
+                new_urls.discard(url)
+
+        if len(combined_lines) > 2:
+            send_telegram_message("\n".join(combined_lines))
+        # Sentiment Trend Plot (runs only after articles fetched and processed)
+        show_trend(selected_ticker, source)
+
+def show_events(ticker):
+    """Upcoming market events, and how sentiment for the ticker moved around past ones."""
+    st.subheader("📅 Upcoming Market Events")
+    # The whole calendar, as before; market_events.upcoming() gives a bounded window
+    listed = market_events.events()
+    if listed.empty:
+        st.write("No market events.")
+    for event in listed.itertuples():
+        affects = f" • {', '.join(event.tickers)}" if event.tickers else ""
+        st.markdown(f"- **{event.date:%Y-%m-%d}**: {event.event} ({event.impact}){affects}")
+    try:
+        impact = market_events.impact(tickers=[ticker])
+    except Exception as e:
+        st.caption(f"Event impact unavailable: {e}")
+        return
+    if not impact.empty:
+        st.markdown(
+            f"**{ticker} sentiment around recent events** (net score {market_events.PRE_DAYS} days "
+            f"before vs {market_events.POST_DAYS} days from the event)"
+        )
+        st.dataframe(
+            impact.tail(10).iloc[::-1][["date", "event", "pre_net", "post_net", "delta", "pre_articles", "post_articles"]],
+            hide_index=True,
+        )
+
+def show_metrics_panel():
+    """Optional sidebar panel with recent per-stage latencies from the metrics layer."""
+    if not st.sidebar.checkbox("Show pipeline metrics"):
+        return
+    if not metrics.ENABLED:
+        st.sidebar.caption("Set METRICS_ENABLED=1 to collect stage timings.")
+        return
+    rows = metrics.stage_summary()
+    if rows:
+        st.sidebar.dataframe(rows, hide_index=True)
+    else:
+        st.sidebar.caption("No pipeline stages timed yet in this session.")
+
 def main():
     # Load environment variables
     load_dotenv()
+    metrics.start_exporter()
 
     # Streamlit page setup
     st.set_page_config(layout="wide")
@@ -141,77 +279,31 @@ def main():
 
     # Live Price Section
     st.subheader(f"📊 Live Stock Price for {selected_ticker}")
-    ticker_data = yf.Ticker(selected_ticker)
-    price = ticker_data.history(period="1d")["Close"].iloc[-1]
-    st.metric(label=f"{selected_ticker} Current Price", value=f"${price:.2f}")
+    price, as_of = get_quote(selected_ticker, watchlist=tickers)
+    if price is None:
+        st.warning(f"No price available for {selected_ticker}.")
+    else:
+        st.metric(label=f"{selected_ticker} Current Price", value=f"${price:.2f}")
+        st.caption(f"As of {as_of.strftime('%H:%M:%S')}")
 
     # News Section (choose data source)
     st.subheader(f"🔎 News and Sentiment for {selected_ticker}")
-    col1, col2 = st.columns(2)
-    # Render both buttons and capture their clicks
-    newsapi_clicked = col1.button("Fetch via NewsAPI")
-    rss_clicked = col2.button("Fetch via RSS")
+    api_stats = newsapi_stats()
+    st.caption(
+        f"NewsAPI requests left today: {api_stats['remaining_quota']} • "
+        f"cache hit rate: {api_stats['hit_rate']:.0%}"
+    )
 
-    if newsapi_clicked:
-        articles = get_news(selected_ticker)
-        source = "NewsAPI"
-    elif rss_clicked:
-        articles = get_rss_news(selected_ticker)
-        source = "RSS"
+    # With the ingestion daemon running, only show what it has already processed
+    if ingest_store.daemon_alive():
+        show_ingested(selected_ticker)
     else:
-        articles = None
-        source = None
+        fetch_and_show(selected_ticker)
 
-    if articles is None:
-        st.write("Select a source to fetch news.")
-    elif not articles:
-        st.write(f"No articles found via {source}.")
-    else:
-        combined_lines = [f"📰 ${selected_ticker} ({source})", ""]
-        for article in articles:
-            title = article.get("title", "No title")
-            url = article.get("url")
-            st.markdown(f"### {title}")
-            st.caption(f"{article.get('source','Unknown source')} • {article.get('publishedAt','')}")
-            if url:
-                st.markdown(f"[🔗 Read full article]({url})", unsafe_allow_html=True)
-            description = article.get("description") or article.get("content") or "No summary available."
-            summary = summarize(description, selected_ticker)
-            st.success(summary)
-            sentiment_key = extract_sentiment_keyword(summary)
-            pub_str = article.get("publishedAt", "")
-            # Only log and mark processed if this URL hasn't been seen for this source
-            already = is_processed(url, source) if url else False
-            if url and not already:
-                try:
-                    pub_date = datetime.fromisoformat(pub_str.replace("Z", ""))
-                    log_sentiment(selected_ticker, sentiment_key, source, log_date=pub_date.date())
-                except Exception:
-                    log_sentiment(selected_ticker, sentiment_key, source)
-                # Add to Telegram batch
-                combined_lines.append(f"🔹 *{title}*  ")
-                combined_lines.append(f"🧠 {sentiment_key}".strip())
-                combined_lines.append("")  # blank line
-                # Mark this URL as processed to avoid duplicates
-                mark_processed(url, source, process_date=pub_date.date())
-
-        if len(combined_lines) > 2:
-            send_telegram_message("\n".join(combined_lines))
-        # Sentiment Trend Plot (runs only after articles fetched and processed)
-        st.subheader("📈 Sentiment Trend")
-        log_path = f"sentiment_log_{source.lower()}.csv"
-        fig = plot_sentiment_trend(log_path=log_path, ticker=selected_ticker)
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.write(f"No sentiment data to display for {source}.")
+    show_metrics_panel()
 
     # Market Events Calendar
-    st.subheader("📅 Upcoming Market Events")
-    with open("calendar_events.json") as f:
-        events = json.load(f)
-        for event in events:
-            st.markdown(f"- **{event['date']}**: {event['event']} ({event['impact']})")
+    show_events(selected_ticker)
 
 if __name__ == "__main__":
     main()
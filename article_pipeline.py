@@ -0,0 +1,132 @@
+from datetime import datetime
+import near_duplicates
+from fast_classifier import route
+from sentiment_logger import log_sentiment
+from processed_store import filter_unprocessed, mark_processed
+from sentiment_utils import extract_sentiment_keyword, is_error_summary
+from ticker_matcher import get_matcher
+
+
+def article_text(article) -> str:
+    """Text sent for classification: the description, falling back to the content."""
+    return article.get("description") or article.get("content") or "No summary available."
+
+
+def summarize_articles(articles, ticker, source, llm=None):
+    """
+    Return one summary per article, in order.
+
+    Articles that are near-duplicates of one already seen for this ticker (in the
+    signature index or earlier in the same batch) reuse the canonical article's
+    summary and get article["duplicate_of"] set to its URL (also when it is the
+    same URL recorded for another source). Everything else goes
+    through the local classifier / LLM router, and the new canonical signatures
+    are recorded for later fetches.
+    """
+    results = [None] * len(articles)
+    sigs = [near_duplicates.signature(a.get("title"), a.get("description")) for a in articles]
+    canonical = []   # (signature, index) of articles summarized in this batch
+    batch_dups = {}  # index -> index of its canonical article in this batch
+    to_summarize = []
+
+    for i, (article, sig) in enumerate(zip(articles, sigs)):
+        match = near_duplicates.find_duplicate(sig, ticker)
+        if match and match["summary"]:
+            results[i] = match["summary"]
+            # The same URL counts too when it was recorded for another source
+            # (already logged there); only a re-fetch for the same source is not a duplicate
+            if match["url"] != article.get("url") or (match["source"] or "").lower() != source.lower():
+                article["duplicate_of"] = match["url"]
+            continue
+        if sig is not None:
+            j = next((j for s, j in canonical if near_duplicates.similarity(sig, s) >= near_duplicates.THRESHOLD), None)
+            if j is not None:
+                batch_dups[i] = j
+                continue
+            canonical.append((sig, i))
+        to_summarize.append(i)
+
+    summaries = route([article_text(articles[i]) for i in to_summarize], ticker, llm=llm)
+    for i, summary in zip(to_summarize, summaries):
+        results[i] = summary
+        if not is_error_summary(summary):
+            near_duplicates.record(sigs[i], ticker, articles[i].get("url"), source, summary)
+
+    for i, j in batch_dups.items():
+        results[i] = results[j]
+        articles[i]["duplicate_of"] = articles[j].get("url")
+    return results
+
+
+def published_date(article):
+    """The article's publication date, or None if publishedAt is missing or malformed."""
+    try:
+        return datetime.fromisoformat(article.get("publishedAt", "").replace("Z", "")).date()
+    except Exception:
+        return None
+
+
+def ingest_articles(articles, ticker, source, llm=None, tag_mentions=False):
+    """
+    Summarize, log and mark processed the articles not yet processed for source.
+
+    Returns one record per new article (url, title, publishedAt, source, summary,
+    sentiment, duplicate_of, tickers). Near-duplicates are marked processed but
+    not logged again. With tag_mentions, sentiment is also logged under every
+    watchlist ticker the article mentions. Articles with a "via" label (e.g.
+    the RSS fallback of a NewsAPI fetch) are handled under that source instead.
+    Articles whose summary failed are left unprocessed so the next fetch retries them.
+    """
+    by_source = {}
+    for article in articles:
+        by_source.setdefault(article.get("via") or source, []).append(article)
+    if set(by_source) - {source}:
+        return [record for label, group in by_source.items()
+                for record in ingest_articles(group, ticker, label, llm=llm, tag_mentions=tag_mentions)]
+
+    new_urls = set(filter_unprocessed([a.get("url") for a in articles if a.get("url")], source))
+    fresh = []
+    for article in articles:
+        url = article.get("url")
+        if url in new_urls:
+            fresh.append(article)
+            new_urls.discard(url)
+    if not fresh:
+        return []
+
+    matcher = get_matcher() if tag_mentions else None
+    records = []
+    summaries = summarize_articles(fresh, ticker, source, llm=llm)
+    for article, summary in zip(fresh, summaries):
+        if is_error_summary(summary):
+            continue
+        sentiment = extract_sentiment_keyword(summary)
+        pub_date = published_date(article)
+        mentioned = sorted(matcher.match(f"{article.get('title') or ''} {article_text(article)}")) if matcher else []
+        if not article.get("duplicate_of"):
+            for tagged in [ticker] + mentioned:
+                log_sentiment(tagged, sentiment, source, log_date=pub_date)
+        mark_processed(article["url"], source, process_date=pub_date)
+        records.append({
+            "url": article["url"],
+            "title": article.get("title", "No title"),
+            "publishedAt": article.get("publishedAt", ""),
+            "source": article.get("source", "Unknown source"),
+            "summary": summary,
+            "sentiment": sentiment,
+            "duplicate_of": article.get("duplicate_of"),
+            "tickers": mentioned,
+        })
+    return records
+
+
+def ingest_pages(pages, ticker, source, llm=None, tag_mentions=False):
+    """
+    ingest_articles over an iterable of article batches (e.g. NewsAPI pages from
+    news_fetcher.prefetch), processing each batch as soon as it arrives.
+    Returns the records of all batches.
+    """
+    records = []
+    for articles in pages:
+        records.extend(ingest_articles(articles, ticker, source, llm=llm, tag_mentions=tag_mentions))
+    return records
@@ -0,0 +1,192 @@
+"""
+Headless scanner that runs the fetch -> summarize -> log pipeline for every
+ticker on the watchlist.
+
+Usage:
+    python batch_scan.py [--tickers-file tickers.csv] [--sources newsapi rss]
+
+Fetches run concurrently with a separate concurrency limit per source, and
+summarization is pipelined behind fetching through a bounded queue.
+"""
+import argparse
+import csv
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from news_fetcher import iter_news_pages, get_rss_news
+from summarizer import summarize_many
+from fast_classifier import router_stats
+from article_pipeline import ingest_articles
+from processed_store import filter_unprocessed
+import summary_cache
+import metrics
+import ticker_metadata
+from ticker_matcher import get_matcher
+
+# Source label (as used by app.main for logs and the processed store) -> fetcher
+# yielding article batches; NewsAPI pages are handed on as they arrive
+FETCHERS = {
+    "newsapi": ("NewsAPI", lambda ticker: iter_news_pages(ticker, unprocessed_for="NewsAPI")),
+    "rss": ("RSS", lambda ticker: [get_rss_news(ticker, unprocessed_for="RSS")]),
+}
+
+_DONE = object()
+
+
+def read_tickers(path: str = "tickers.csv") -> list:
+    """Read the watchlist from a one-column CSV file, skipping blanks and duplicates."""
+    tickers = []
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            t = row[0].strip().upper()
+            if t and t != "TICKER" and t not in tickers:
+                tickers.append(t)
+    return tickers
+
+
+class ScanStats:
+    """Thread-safe counters for a scan run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {
+            "tickers": 0, "fetches": 0, "fetch_errors": 0,
+            "articles": 0, "new_articles": 0, "duplicates": 0, "llm_calls_saved": 0,
+        }
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                self.counts[name] += value
+
+    def report(self, elapsed: float) -> dict:
+        with self._lock:
+            result = dict(self.counts)
+        result["elapsed_s"] = round(elapsed, 2)
+        result["tickers_per_s"] = round(result["tickers"] / elapsed, 2) if elapsed else 0.0
+        result["articles_per_s"] = round(result["articles"] / elapsed, 2) if elapsed else 0.0
+        return result
+
+
+def _fetch(ticker, source_key, out_queue, stats):
+    """Fetch one ticker from one source and hand each batch of articles to the summarize stage."""
+    label, fetcher = FETCHERS[source_key]
+    try:
+        for articles in fetcher(ticker):
+            stats.add(fetches=1, articles=len(articles))
+            # Blocks when the summarize stage falls behind, bounding memory use
+            out_queue.put((ticker, label, articles or []))
+    except Exception as e:
+        print(f"Fetch failed for {ticker} via {label}: {e}")
+        stats.add(fetch_errors=1)
+
+
+def _already_processed(articles, source) -> int:
+    """How many of the articles were processed before, under their own source label."""
+    by_source = {}
+    for article in articles:
+        if article.get("url"):
+            by_source.setdefault(article.get("via") or source, []).append(article["url"])
+    return sum(len(urls) - len(filter_unprocessed(urls, label)) for label, urls in by_source.items())
+
+
+def _process(ticker, source, articles, stats):
+    """Summarize and log the articles of one fetch that have not been processed yet."""
+    # Counted before ingesting, which marks the new ones processed; failed
+    # summaries are not processed and so are not counted as saved
+    skipped = _already_processed(articles, source)
+    records = ingest_articles(articles, ticker, source, llm=summarize_many)
+    duplicates = sum(1 for r in records if r["duplicate_of"])
+    stats.add(new_articles=len(records), duplicates=duplicates, llm_calls_saved=skipped)
+
+
+def _summarize_worker(in_queue, stats):
+    """Consume fetched batches until the end marker arrives."""
+    while True:
+        item = in_queue.get()
+        if item is _DONE:
+            in_queue.put(_DONE)  # let sibling workers stop too
+            return
+        ticker, source, articles = item
+        try:
+            _process(ticker, source, articles, stats)
+        except Exception as e:
+            print(f"Processing failed for {ticker} via {source}: {e}")
+
+
+def run_scan(tickers, sources=("newsapi", "rss"), limits=None, queue_size=32, summarize_workers=2):
+    """
+    Run the pipeline for every ticker and source. limits maps a source key to its
+    maximum number of concurrent fetches. Returns the throughput stats.
+    """
+    limits = limits or {}
+    stats = ScanStats()
+    work_queue = queue.Queue(maxsize=queue_size)
+    start = time.perf_counter()
+
+    workers = [
+        threading.Thread(target=_summarize_worker, args=(work_queue, stats), daemon=True)
+        for _ in range(summarize_workers)
+    ]
+    for w in workers:
+        w.start()
+
+    pools = {s: ThreadPoolExecutor(max_workers=limits.get(s, 4)) for s in sources}
+    futures = []
+    for ticker in tickers:
+        for s in sources:
+            futures.append(pools[s].submit(_fetch, ticker, s, work_queue, stats))
+    for pool in pools.values():
+        pool.shutdown(wait=True)
+    stats.add(tickers=len(tickers))
+
+    work_queue.put(_DONE)
+    for w in workers:
+        w.join()
+
+    report = stats.report(time.perf_counter() - start)
+    cache = summary_cache.stats()
+    report["summary_cache_hits"] = cache["hits"]
+    report["fast_path_articles"] = router_stats()["fast_path"]
+    report["llm_calls_saved"] += cache["hits"] + report["fast_path_articles"] + report["duplicates"]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan news sentiment for the whole watchlist.")
+    parser.add_argument("--tickers-file", default="tickers.csv", help="one ticker per line")
+    parser.add_argument("--sources", nargs="+", choices=sorted(FETCHERS), default=["newsapi", "rss"])
+    parser.add_argument("--newsapi-concurrency", type=int, default=2)
+    parser.add_argument("--rss-concurrency", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=32, help="max fetched batches awaiting summarization")
+    parser.add_argument("--summarize-workers", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    metrics.start_exporter()
+    tickers = read_tickers(args.tickers_file)
+    if "newsapi" in args.sources:
+        # Resolve company names for the whole watchlist up front
+        warmed = ticker_metadata.warm_up(tickers)
+        print(f"Ticker metadata refreshed for {warmed} tickers")
+    # Build the shared ticker matcher over the whole watchlist once
+    get_matcher().update(tickers)
+    print(f"Scanning {len(tickers)} tickers via {', '.join(args.sources)}")
+    report = run_scan(
+        tickers,
+        sources=args.sources,
+        limits={"newsapi": args.newsapi_concurrency, "rss": args.rss_concurrency},
+        queue_size=args.queue_size,
+        summarize_workers=args.summarize_workers,
+    )
+    for name, value in report.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
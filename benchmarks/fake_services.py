@@ -0,0 +1,247 @@
+"""
+Local stand-ins for the external APIs the pipeline talks to.
+
+One threaded HTTP server answers:
+    GET  /v2/everything               NewsAPI search
+    GET  /rss/2.0/headline?s=TICKER   Yahoo Finance RSS feed (with ETag / 304 support)
+    POST /v1/chat/completions         OpenAI chat completions (single and batch prompts)
+    POST /bot<token>/sendMessage      Telegram Bot API
+
+Each service has its own latency (mean and jitter, in milliseconds), error rate
+and payload size, so the benchmark can model slow or flaky dependencies.
+Responses are generated deterministically from the request, so repeated runs
+see the same articles.
+"""
+import re
+import json
+import time
+import zlib
+import random
+import hashlib
+import threading
+from email.utils import formatdate
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-service behaviour; override single values with configure() or --set service.key=value
+DEFAULTS = {
+    "newsapi": {"latency_ms": 80, "jitter_ms": 20, "error_rate": 0.0, "articles": 6, "description_chars": 300},
+    "rss": {"latency_ms": 40, "jitter_ms": 10, "error_rate": 0.0, "articles": 10, "description_chars": 300},
+    "openai": {"latency_ms": 400, "jitter_ms": 100, "error_rate": 0.0, "action_chars": 80},
+    "telegram": {"latency_ms": 60, "jitter_ms": 20, "error_rate": 0.0},
+}
+
+_WORDS = (
+    "shares rally after earnings beat guidance revenue growth analysts upgrade outlook demand "
+    "margin pressure lawsuit downgrade supply chain record quarter investors expect buyback "
+    "dividend contract partnership regulators approval launch product market volatility"
+).split()
+_SENTIMENTS = ("Bullish", "Bearish", "Neutral")
+
+
+def _text(seed: str, chars: int) -> str:
+    """Deterministic filler text of about chars characters."""
+    rng = random.Random(zlib.crc32(seed.encode("utf-8")))
+    words = []
+    length = 0
+    while length < chars:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+class FakeServices:
+    """All four fakes on one local port; use as a context manager or call start()/stop()."""
+
+    def __init__(self, config=None, host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.config = {name: dict(values) for name, values in DEFAULTS.items()}
+        for name, values in (config or {}).items():
+            self.config[name].update(values)
+        self.counts = {name: 0 for name in DEFAULTS}
+        self.errors = {name: 0 for name in DEFAULTS}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Fixed publication time so feed bodies (and their ETags) stay stable
+        self._published = datetime.utcnow() - timedelta(hours=1)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """Environment variables that point the pipeline at these fakes."""
+        return {
+            "NEWSAPI_BASE_URL": self.base_url,
+            "YAHOO_RSS_BASE_URL": self.base_url,
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+            "TELEGRAM_API_BASE": self.base_url,
+            "NEWS_API_KEY": "bench",
+            "OPENAI_API_KEY": "bench",
+            "TELEGRAM_BOT_TOKEN": "bench",
+            "TELEGRAM_CHAT_ID": "1",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay_and_fail(self, service: str) -> bool:
+        """Sleep for the service's latency; returns True if this request should fail."""
+        cfg = self.config[service]
+        with self._lock:
+            self.counts[service] += 1
+            delay = max(0.0, self._rng.gauss(cfg["latency_ms"], cfg["jitter_ms"])) / 1000
+            fail = self._rng.random() < cfg["error_rate"]
+            if fail:
+                self.errors[service] += 1
+        time.sleep(delay)
+        return fail
+
+    # -- payloads -----------------------------------------------------------
+
+    def newsapi_payload(self, query: str, page: int, page_size: int) -> dict:
+        match = re.search(r'"([^"\s]+) stock"', query)
+        ticker = match.group(1) if match else "MARKET"
+        cfg = self.config["newsapi"]
+        count = min(cfg["articles"], page_size)
+        articles = []
+        for i in range(count):
+            n = (page - 1) * page_size + i
+            articles.append({
+                "source": {"id": None, "name": f"Wire {n % 5}"},
+                "title": f"{ticker} stock {_text(f'{ticker}-title-{n}', 40)}",
+                "description": _text(f"{ticker}-desc-{n}", cfg["description_chars"]),
+                "url": f"https://news.example.com/{ticker.lower()}/{n}",
+                "publishedAt": (self._published - timedelta(minutes=n)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            })
+        return {"status": "ok", "totalResults": count, "articles": articles}
+
+    def rss_payload(self, ticker: str) -> bytes:
+        cfg = self.config["rss"]
+        items = []
+        for n in range(cfg["articles"]):
+            published = formatdate((self._published - timedelta(minutes=n)).timestamp(), usegmt=True)
+            items.append(
+                "<item>"
+                f"<title>{ticker} {_text(f'{ticker}-rss-title-{n}', 40)}</title>"
+                f"<link>https://finance.example.com/{ticker.lower()}/{n}</link>"
+                f"<description>{_text(f'{ticker}-rss-desc-{n}', cfg['description_chars'])}</description>"
+                f"<pubDate>{published}</pubDate>"
+                "</item>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Yahoo! Finance: {ticker} News</title>{''.join(items)}</channel></rss>"
+        ).encode("utf-8")
+
+    def openai_payload(self, request: dict) -> dict:
+        prompt = request["messages"][-1]["content"]
+        cfg = self.config["openai"]
+        positions = re.findall(r"^\[(\d+)\] ", prompt, re.MULTILINE)
+        if positions:
+            answer = {
+                pos: {"sentiment": _SENTIMENTS[zlib.crc32(f"{prompt}{pos}".encode()) % 3],
+                      "action": _text(f"{prompt}{pos}", cfg["action_chars"])}
+                for pos in positions
+            }
+            content = json.dumps(answer)
+        else:
+            sentiment = _SENTIMENTS[zlib.crc32(prompt.encode()) % 3]
+            content = f"Sentiment: {sentiment}\nSuggested Action: {_text(prompt, cfg['action_chars'])}"
+        return {
+            "id": "chatcmpl-" + hashlib.sha1(prompt.encode()).hexdigest()[:12],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    # -- HTTP plumbing ------------------------------------------------------
+
+    def _handler_class(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/v2/everything":
+                    if services._delay_and_fail("newsapi"):
+                        return self._send(500, {"status": "error", "code": "unexpectedError"})
+                    payload = services.newsapi_payload(
+                        query.get("q", ""), int(query.get("page", 1)), int(query.get("pageSize", 100)))
+                    return self._send(200, payload)
+                if url.path == "/rss/2.0/headline":
+                    if services._delay_and_fail("rss"):
+                        return self._send(503, b"", "text/plain")
+                    body = services.rss_payload(query.get("s", "^DJI"))
+                    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._send(304, b"", "application/rss+xml", {"ETag": etag})
+                    return self._send(200, body, "application/rss+xml", {"ETag": etag})
+                self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if url.path == "/v1/chat/completions":
+                    if services._delay_and_fail("openai"):
+                        return self._send(500, {"error": {"message": "fake upstream error", "type": "server_error"}})
+                    return self._send(200, services.openai_payload(json.loads(body)))
+                if url.path.startswith("/bot") and url.path.endswith("/sendMessage"):
+                    if services._delay_and_fail("telegram"):
+                        return self._send(429, {"ok": False, "error_code": 429,
+                                                "parameters": {"retry_after": 1}})
+                    return self._send(200, {"ok": True, "result": {"message_id": services.counts["telegram"]}})
+                self._send(404, {"error": "not found"})
+
+        return Handler
+
+
+def parse_overrides(items) -> dict:
+    """Turn ["openai.latency_ms=50", ...] into {"openai": {"latency_ms": 50.0}}."""
+    config = {}
+    for item in items or ():
+        key, _, value = item.partition("=")
+        service, _, field = key.partition(".")
+        if service not in DEFAULTS or field not in DEFAULTS[service]:
+            raise ValueError(f"Unknown fake setting: {key}")
+        kind = type(DEFAULTS[service][field])
+        config.setdefault(service, {})[field] = kind(float(value)) if kind is int else kind(value)
+    return config
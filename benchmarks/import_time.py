@@ -0,0 +1,99 @@
+"""
+Cold-start import-time check with a per-module budget.
+
+Usage:
+    python benchmarks/import_time.py [--budget benchmarks/import_budget.json] [--repeat 5]
+    python benchmarks/import_time.py --update [--headroom 1.5]
+
+Each module is imported in a fresh interpreter with `python -X importtime`, and
+the cumulative time reported for the module itself is taken (best of --repeat
+runs, to smooth out noise). Modules over their budget (in milliseconds) are
+listed with their heaviest dependencies and the exit status is 1, so a cold
+start regression fails CI. --update rewrites the budget from the current
+measurements with some headroom.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> list:
+    """Parse -X importtime output into (module, self_us, cumulative_us, depth) tuples."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def measure(module: str) -> dict:
+    """Import module in a fresh interpreter; return its cumulative time and heaviest imports."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        error = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        return {"error": error[-1] if error else "import failed"}
+    entries = parse_importtime(proc.stderr)
+    total = next((cum for name, _, cum, depth in reversed(entries) if name == module and depth == 0), None)
+    if total is None:
+        return {"error": "module did not appear in -X importtime output (already imported?)"}
+    heaviest = sorted(((cum, name) for name, _, cum, depth in entries if depth == 1), reverse=True)[:5]
+    return {"ms": total / 1000, "heaviest": [(name, round(cum / 1000, 1)) for cum, name in heaviest]}
+
+
+def best_of(module: str, repeat: int) -> dict:
+    results = [measure(module) for _ in range(repeat)]
+    ok = [r for r in results if "error" not in r]
+    return min(ok, key=lambda r: r["ms"]) if ok else results[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check module import times against a budget.")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="JSON file mapping module -> budget in ms")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh imports per module; the best is kept")
+    parser.add_argument("--update", action="store_true", help="rewrite the budget from current measurements")
+    parser.add_argument("--headroom", type=float, default=1.5, help="budget = measurement * headroom with --update")
+    parser.add_argument("--json", action="store_true", help="print the measurements as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.budget) as f:
+        budget = json.load(f)
+    results = {module: best_of(module, args.repeat) for module in budget}
+
+    if args.update:
+        updated = {m: round(r["ms"] * args.headroom) if "ms" in r else budget[m] for m, r in results.items()}
+        with open(args.budget, "w") as f:
+            json.dump(updated, f, indent=2)
+            f.write("\n")
+        print(f"Updated {args.budget}")
+        return 0
+
+    failed = []
+    for module, result in results.items():
+        if "error" in result:
+            failed.append(module)
+            print(f"FAIL {module}: {result['error']}")
+        elif result["ms"] > budget[module]:
+            failed.append(module)
+            heaviest = ", ".join(f"{name} {ms}ms" for name, ms in result["heaviest"])
+            print(f"FAIL {module}: {result['ms']:.1f}ms > {budget[module]}ms budget (heaviest: {heaviest})")
+        else:
+            print(f"ok   {module}: {result['ms']:.1f}ms (budget {budget[module]}ms)")
+    if args.json:
+        print(json.dumps({"budget": budget, "results": results}, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Offline end-to-end benchmark of the news pipeline.
+
+Usage:
+    python benchmarks/pipeline_bench.py [--scales 1 100 1000] [--concurrency 8]
+                                        [--set openai.latency_ms=50 ...] [--output bench.json]
+
+Starts the local fakes from fake_services.py and, for every scale, runs the
+pipeline in a fresh subprocess and working directory: news_fetcher (NewsAPI
+and RSS), the processed store, summarizer, sentiment_logger and Telegram
+alerts for every ticker, followed by the dashboard aggregations over the
+resulting rollups. Reports p50/p95 latency per stage, throughput and peak RSS
+as JSON so runs can be compared over time.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of values (q in 0..100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize_timings(samples: dict) -> dict:
+    return {
+        stage: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "max_ms": round(max(values) * 1000, 2),
+        }
+        for stage, values in samples.items() if values
+    }
+
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_tickers(count: int) -> list:
+    return [f"B{i:04d}" for i in range(count)]
+
+
+def dashboard_aggregate(read_counts, start_date):
+    """The aggregations pages/dashboard.py runs on every view."""
+    import pandas as pd
+    df = read_counts(start_date=start_date, sources=["newsapi", "rss"])
+    idx = pd.MultiIndex.from_product(
+        [df["ticker"].unique(), df["source"].unique(), df["sentiment"].unique()],
+        names=["ticker", "source", "sentiment"],
+    )
+    counts = pd.Series(0, index=idx).reset_index(name="count")
+    actual = df.groupby(["ticker", "source", "sentiment"])["count"].sum().reset_index(name="count")
+    counts = counts.merge(actual, on=["ticker", "source", "sentiment"], how="left", suffixes=("", "_actual"))
+    counts["count"] = counts["count_actual"].fillna(0)
+    summary = df.groupby(["ticker", "sentiment"])["count"].sum().unstack(fill_value=0)
+    trend = df.groupby(["date", "sentiment"])["count"].sum().reset_index(name="count")
+    return len(counts), len(summary), len(trend)
+
+
+def run_child(scale: int, concurrency: int) -> dict:
+    """Run one scale in this (fresh) process; the caller sets cwd and the fake endpoints."""
+    tickers = bench_tickers(scale)
+    # Seed company names so no yfinance lookups happen
+    with open("ticker_metadata.json", "w") as f:
+        json.dump({t: {"ok": True, "longName": f"Bench {t} Corp", "shortName": "", "exchange": "",
+                       "fetched_at": time.time()} for t in tickers}, f)
+
+    start_import = time.perf_counter()
+    from news_fetcher import get_news, get_rss_news
+    from summarizer import summarize_all
+    from processed_store import filter_unprocessed, mark_processed
+    from sentiment_logger import log_sentiment
+    from sentiment_rollup import read_counts
+    from telegram_alerts import send_telegram_message
+    from article_pipeline import article_text, published_date
+    from sentiment_utils import extract_sentiment_keyword
+    import alert_dispatcher
+    import_s = time.perf_counter() - start_import
+
+    samples = {name: [] for name in (
+        "fetch_newsapi", "fetch_rss", "processed_filter", "summarize",
+        "log_and_mark", "telegram_enqueue", "ticker_total")}
+    lock = threading.Lock()
+    totals = {"articles": 0, "new_articles": 0}
+
+    def timed(stage, fn, *args):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        with lock:
+            samples[stage].append(time.perf_counter() - t0)
+        return result
+
+    def one_ticker(ticker):
+        t0 = time.perf_counter()
+        for source, fetcher in (("NewsAPI", get_news), ("RSS", get_rss_news)):
+            stage = "fetch_newsapi" if source == "NewsAPI" else "fetch_rss"
+            articles = timed(stage, fetcher, ticker) or []
+            # The NewsAPI fetcher falls back to RSS once the quota is spent
+            source = articles[0].get("via", source) if articles else source
+            new_urls = set(timed("processed_filter", filter_unprocessed,
+                                 [a["url"] for a in articles if a.get("url")], source))
+            fresh = [a for a in articles if a.get("url") in new_urls]
+            summaries = timed("summarize", summarize_all, [article_text(a) for a in fresh], ticker)
+
+            def log_all():
+                for article, summary in zip(fresh, summaries):
+                    pub_date = published_date(article)
+                    log_sentiment(ticker, extract_sentiment_keyword(summary), source, log_date=pub_date)
+                    mark_processed(article["url"], source, process_date=pub_date)
+            timed("log_and_mark", log_all)
+            if fresh:
+                lines = [f"📰 ${ticker} ({source})", ""] + [f"🔹 *{a['title']}*" for a in fresh]
+                timed("telegram_enqueue", send_telegram_message, "\n".join(lines))
+            with lock:
+                totals["articles"] += len(articles)
+                totals["new_articles"] += len(fresh)
+        with lock:
+            samples["ticker_total"].append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_ticker, tickers))
+    pipeline_s = time.perf_counter() - start
+
+    t0 = time.perf_counter()
+    delivered = alert_dispatcher.flush(timeout=max(60, scale))
+    samples["telegram_drain"] = [time.perf_counter() - t0]
+
+    start_date = date.today() - timedelta(days=7)
+    samples["dashboard_aggregate"] = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        dashboard_aggregate(read_counts, start_date)
+        samples["dashboard_aggregate"].append(time.perf_counter() - t0)
+
+    return {
+        "tickers": scale,
+        "concurrency": concurrency,
+        "import_s": round(import_s, 3),
+        "pipeline_s": round(pipeline_s, 3),
+        "throughput": {
+            "tickers_per_s": round(scale / pipeline_s, 2) if pipeline_s else 0.0,
+            "articles_per_s": round(totals["articles"] / pipeline_s, 2) if pipeline_s else 0.0,
+        },
+        "articles": totals["articles"],
+        "new_articles": totals["new_articles"],
+        "alerts_delivered": delivered,
+        "stages": summarize_timings(samples),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_scale(scale: int, concurrency: int, env: dict) -> dict:
+    """Run one scale in a subprocess with its own working directory."""
+    with tempfile.TemporaryDirectory(prefix=f"bench-{scale}-") as workdir:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(scale), "--concurrency", str(concurrency)],
+            cwd=workdir, env=dict(os.environ, **env), capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        return {"tickers": scale, "error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    from fake_services import FakeServices, parse_overrides
+
+    parser = argparse.ArgumentParser(description="Offline benchmark of the news pipeline against local fakes.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 1000], help="ticker counts to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="tickers processed in parallel")
+    parser.add_argument("--set", dest="overrides", action="append", metavar="SERVICE.KEY=VALUE",
+                        help="override a fake setting, e.g. openai.latency_ms=50 or rss.error_rate=0.05")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        print(json.dumps(run_child(args.child, args.concurrency)))
+        return
+
+    with FakeServices(parse_overrides(args.overrides)) as fakes:
+        env = dict(fakes.env(), NEWSAPI_DAILY_QUOTA="1000000", TELEGRAM_COALESCE_WINDOW="0.2",
+                   PYTHONPATH=ROOT)
+        results = [run_scale(scale, args.concurrency, env) for scale in args.scales]
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "fakes": fakes.config,
+            "requests": fakes.counts,
+            "injected_errors": fakes.errors,
+            "results": results,
+        }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
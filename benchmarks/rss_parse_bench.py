@@ -0,0 +1,134 @@
+"""
+RSS parsing benchmark: streaming rss_stream versus feedparser.
+
+Usage:
+    python benchmarks/rss_parse_bench.py [--items 20 500 5000] [--fresh 0.1] [--repeat 5]
+                                         [--processed 0.5] [--output rss_bench.json]
+
+For every feed size a synthetic RSS document is generated, newest first, with
+the --fresh fraction of its items inside the 7-day window and the rest older.
+The --processed fraction of the fresh links is marked as processed. Both
+parsers then produce the same selection as get_rss_news (up to 10 fresh,
+unprocessed items):
+    feedparser  parse the whole document, then filter
+    stream      rss_stream.iter_items + select, stopping early
+Reports the best-of --repeat wall time and the peak traced memory per parser
+as JSON, and checks that both select the same links.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import importlib.util
+from email.utils import formatdate
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rss_stream
+from fake_services import _text
+
+LIMIT = 10
+MAX_AGE = timedelta(days=7)
+
+
+def make_feed(items: int, fresh: float, description_chars: int = 300) -> bytes:
+    """A Yahoo-style RSS document with items newest first, fresh fraction within the last 7 days."""
+    now = datetime.utcnow()
+    n_fresh = int(items * fresh)
+    parts = []
+    for n in range(items):
+        if n < n_fresh:
+            published = now - MAX_AGE * (n + 1) / (n_fresh + 1)
+        else:
+            published = now - MAX_AGE - timedelta(hours=n - n_fresh + 1)
+        parts.append(
+            "<item>"
+            f"<title>{_text(f'title-{n}', 60)}</title>"
+            f"<link>https://finance.example.com/bench/{n}</link>"
+            f"<description>{_text(f'desc-{n}', description_chars)}</description>"
+            f"<pubDate>{formatdate((published - datetime(1970, 1, 1)).total_seconds(), usegmt=True)}</pubDate>"
+            f'<guid isPermaLink="false">bench-{n}</guid>'
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>Yahoo! Finance: BENCH News</title>{''.join(parts)}</channel></rss>"
+    ).encode("utf-8")
+
+
+def with_feedparser(data: bytes, cutoff, processed) -> list:
+    import feedparser
+    links = []
+    for entry in feedparser.parse(data).entries:
+        parsed = entry.get("published_parsed")
+        if not parsed or datetime(*parsed[:6]) < cutoff or entry.get("link") in processed:
+            continue
+        links.append(entry.get("link"))
+    return links[:LIMIT]
+
+
+def with_stream(data: bytes, cutoff, processed) -> list:
+    items = rss_stream.select(rss_stream.iter_items(data), cutoff, LIMIT, processed.__contains__)
+    return [item["link"] for item in items]
+
+
+def measure(fn, data, cutoff, processed, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(data, cutoff, processed)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn(data, cutoff, processed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(best * 1000, 2), "peak_kb": round(peak / 1024, 1), "selected": result}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark streaming RSS parsing against feedparser.")
+    parser.add_argument("--items", type=int, nargs="+", default=[20, 500, 5000], help="items per feed")
+    parser.add_argument("--fresh", type=float, default=0.1, help="fraction of items inside the 7-day window")
+    parser.add_argument("--processed", type=float, default=0.5, help="fraction of fresh links already processed")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per parser; the best is kept")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    if importlib.util.find_spec("feedparser") is None:
+        parser.error("feedparser is required for the comparison (pip install feedparser)")
+
+    cutoff = datetime.utcnow() - MAX_AGE
+    report = []
+    for items in args.items:
+        data = make_feed(items, args.fresh)
+        n_fresh = int(items * args.fresh)
+        # Evenly spread, floor(n_fresh * processed) of them
+        processed = {f"https://finance.example.com/bench/{n}" for n in range(n_fresh)
+                     if int((n + 1) * args.processed) > int(n * args.processed)}
+        fp = measure(with_feedparser, data, cutoff, processed, args.repeat)
+        stream = measure(with_stream, data, cutoff, processed, args.repeat)
+        report.append({
+            "items": items,
+            "feed_kb": round(len(data) / 1024, 1),
+            "feedparser": {"ms": fp["ms"], "peak_kb": fp["peak_kb"]},
+            "stream": {"ms": stream["ms"], "peak_kb": stream["peak_kb"]},
+            "speedup": round(fp["ms"] / stream["ms"], 1) if stream["ms"] else None,
+            "same_selection": fp["selected"] == stream["selected"],
+        })
+
+    output = json.dumps({"fresh": args.fresh, "processed": args.processed, "results": report}, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0 if all(r["same_selection"] for r in report) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
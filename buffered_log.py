@@ -0,0 +1,152 @@
+"""
+Buffered, multi-process-safe CSV appender for the sentiment and processed logs.
+
+Rows are kept in memory per file and written in bulk once LOG_FLUSH_ROWS rows
+are pending or the oldest has waited LOG_FLUSH_INTERVAL seconds (checked by a
+background flusher thread), and at interpreter exit. Each flush takes an
+exclusive flock on the file, writes the header only if the file is empty
+(checked under the lock, so concurrent sessions or a batch job next to the UI
+never duplicate it), appends all rows in one write and fsyncs.
+"""
+import os
+import io
+import csv
+import time
+import atexit
+import threading
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locking on this platform
+    fcntl = None
+
+FLUSH_ROWS = int(os.getenv("LOG_FLUSH_ROWS", "64"))
+FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2"))
+
+_writers = {}
+_writers_lock = threading.Lock()
+_flusher = None
+
+
+def _encode_rows(rows) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+class BufferedCSVWriter:
+    """Appends rows to one CSV file in batches; see the module docstring."""
+
+    def __init__(self, path: str, header):
+        self.path = path
+        self.header = list(header)
+        self._rows = []
+        self._first_at = 0.0
+        self._lock = threading.Lock()
+
+    def append(self, row):
+        with self._lock:
+            if not self._rows:
+                self._first_at = time.monotonic()
+            self._rows.append(list(row))
+            full = len(self._rows) >= FLUSH_ROWS
+        if full:
+            self.flush()
+
+    def pending(self) -> list:
+        """Rows not written yet."""
+        with self._lock:
+            return list(self._rows)
+
+    def due(self, now: float) -> bool:
+        with self._lock:
+            return bool(self._rows) and now - self._first_at >= FLUSH_INTERVAL
+
+    def flush(self) -> int:
+        """Write all pending rows; returns how many were written."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                with metrics.span("log_flush", file=os.path.basename(self.path)):
+                    self._write(_encode_rows(rows))
+            except OSError:
+                # Keep the rows for the next attempt, in order
+                self._rows = rows + self._rows
+                raise
+        return len(rows)
+
+    def _write(self, data: bytes):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size == 0:
+                data = _encode_rows([self.header]) + data
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)  # also releases the lock
+
+
+def get_writer(path: str, header) -> BufferedCSVWriter:
+    """The process-wide writer for path, created (and the flusher started) on first use."""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = BufferedCSVWriter(path, header)
+        _start_flusher()
+    return writer
+
+
+def append(path: str, header, row):
+    """Buffer one row for path (header is written if the file is new)."""
+    get_writer(path, header).append(row)
+
+
+def pending(path: str) -> list:
+    """Rows buffered for path in this process and not written yet."""
+    with _writers_lock:
+        writer = _writers.get(os.path.abspath(path))
+    return writer.pending() if writer is not None else []
+
+
+def flush_all():
+    """Write every pending row; called at exit and before reading the logs in-process."""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        try:
+            writer.flush()
+        except OSError as e:
+            print(f"Could not flush {writer.path}: {e}")
+
+
+def _run_flusher():
+    while True:
+        time.sleep(FLUSH_INTERVAL / 2)
+        now = time.monotonic()
+        with _writers_lock:
+            writers = list(_writers.values())
+        for writer in writers:
+            if writer.due(now):
+                try:
+                    writer.flush()
+                except OSError as e:
+                    print(f"Could not flush {writer.path}: {e}")
+
+
+def _start_flusher():
+    """Start the background flusher once per process. Must be called with _writers_lock held."""
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = threading.Thread(target=_run_flusher, name="log-flusher", daemon=True)
+        _flusher.start()
+
+
+atexit.register(flush_all)
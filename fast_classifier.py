@@ -0,0 +1,227 @@
+"""
+Local fast-path sentiment classifier and LLM router.
+
+A finance lexicon scorer, vectorized with NumPy across a batch of articles,
+labels each text bullish/bearish/neutral with a confidence. route() answers
+confident articles locally and only escalates the rest to the LLM.
+
+Offline evaluation against LLM labels:
+    python fast_classifier.py eval [--labels labelled.csv] [--threshold 0.85]
+Without --labels the texts and GPT answers stored in the summary cache are used;
+a labels CSV needs 'text' and 'sentiment' columns. (The sentiment_log_*.csv
+files only hold date/ticker/sentiment, so they cannot be scored directly.)
+
+The summary cache only sees the articles route() escalated, which are mostly
+the low-confidence ones, so figures over the whole cache understate coverage
+and say little about the articles answered locally. To measure those, route()
+also escalates a fixed FAST_CLASSIFIER_HOLDOUT share of articles regardless
+of confidence (picked by a hash of the text), and eval reports the holdout_*
+figures over just those articles as the unbiased estimate.
+"""
+import os
+import re
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+ENABLED = os.getenv("FAST_CLASSIFIER_ENABLED", "1") == "1"
+# Articles with confidence below this are sent to the LLM
+THRESHOLD = float(os.getenv("FAST_CLASSIFIER_THRESHOLD", "0.85"))
+# Share of articles sent to the LLM whatever their confidence, for evaluation
+HOLDOUT_RATE = float(os.getenv("FAST_CLASSIFIER_HOLDOUT", "0.02"))
+
+# Finance lexicon: term -> weight (positive = bullish, negative = bearish)
+LEXICON = {
+    # bullish
+    "beat": 1.5, "beats": 1.5, "surge": 1.5, "surges": 1.5, "surged": 1.5, "soar": 1.5,
+    "soars": 1.5, "soared": 1.5, "rally": 1.2, "rallies": 1.2, "rallied": 1.2, "jump": 1.0,
+    "jumps": 1.0, "jumped": 1.0, "gain": 0.8, "gains": 0.8, "gained": 0.8, "rise": 0.6,
+    "rises": 0.6, "rose": 0.6, "record": 0.8, "upgrade": 1.5, "upgrades": 1.5, "upgraded": 1.5,
+    "outperform": 1.2, "buy": 0.6, "bullish": 2.0, "growth": 0.6, "profit": 0.6,
+    "profitable": 0.8, "strong": 0.6, "stronger": 0.6, "raises": 0.8, "raised": 0.6,
+    "expands": 0.6, "approval": 1.0, "approved": 1.0, "partnership": 0.6, "wins": 0.8,
+    "breakthrough": 1.0, "skyrocketed": 1.8, "skyrockets": 1.8, "upside": 1.0, "higher": 0.5,
+    "exceeds": 1.0, "exceeded": 1.0, "optimistic": 1.0, "momentum": 0.5,
+    # bearish
+    "miss": -1.5, "misses": -1.5, "missed": -1.5, "plunge": -1.5, "plunges": -1.5,
+    "plunged": -1.5, "tumble": -1.2, "tumbles": -1.2, "tumbled": -1.2, "slump": -1.2,
+    "slumps": -1.2, "drop": -0.8, "drops": -0.8, "dropped": -0.8, "fall": -0.8, "falls": -0.8,
+    "fell": -0.8, "decline": -0.8, "declines": -0.8, "declined": -0.8, "downgrade": -1.5,
+    "downgrades": -1.5, "downgraded": -1.5, "underperform": -1.2, "sell": -0.6,
+    "bearish": -2.0, "loss": -0.8, "losses": -0.8, "weak": -0.6, "weaker": -0.6,
+    "cuts": -0.6, "lawsuit": -1.0, "probe": -0.8, "investigation": -0.8, "fraud": -1.5,
+    "recall": -0.8, "layoffs": -1.0, "bankruptcy": -2.0, "warning": -0.8,
+    "warns": -1.0, "risk": -0.4, "risks": -0.4, "downside": -1.0, "lower": -0.5,
+    "short": -0.4, "crash": -1.8, "selloff": -1.2, "pessimistic": -1.0, "delay": -0.6,
+    "delayed": -0.6,
+}
+NEGATIONS = {"not", "no", "never", "without", "fails", "failed"}
+_TOKEN_RE = re.compile(r"[a-z]+")
+# Net score needed before a text is called bullish or bearish
+_MARGIN = 0.5
+
+_terms = list(LEXICON)
+_term_index = {t: i for i, t in enumerate(_terms)}
+_weights = np.array([LEXICON[t] for t in _terms], dtype=np.float64)
+
+_stats_lock = threading.Lock()
+_stats = {"articles": 0, "fast_path": 0, "escalated": 0, "holdout": 0}
+
+
+def classify_batch(texts):
+    """
+    Score a batch of texts. Returns (labels, confidences) where labels is a list
+    of 'bullish' / 'bearish' / 'neutral' and confidences a NumPy array in [0, 1].
+    """
+    texts = list(texts)
+    n = len(texts)
+    if n == 0:
+        return [], np.zeros(0)
+
+    # Gather lexicon hits for the whole batch into flat arrays
+    doc_idx, term_idx, negated = [], [], []
+    for d, text in enumerate(texts):
+        prev = ""
+        for tok in _TOKEN_RE.findall((text or "").lower()):
+            i = _term_index.get(tok)
+            if i is not None:
+                doc_idx.append(d)
+                term_idx.append(i)
+                negated.append(prev in NEGATIONS)
+            prev = tok
+    doc_idx = np.asarray(doc_idx, dtype=np.int64)
+    hit_weights = _weights[np.asarray(term_idx, dtype=np.int64)] if term_idx else np.zeros(0)
+    hit_weights = np.where(np.asarray(negated, dtype=bool), -hit_weights, hit_weights)
+
+    pos = np.bincount(doc_idx, weights=np.clip(hit_weights, 0, None), minlength=n)
+    neg = np.bincount(doc_idx, weights=np.clip(-hit_weights, 0, None), minlength=n)
+    net = pos - neg
+    total = pos + neg
+    # Confidence grows with how one-sided the evidence is and how much there is
+    one_sided = np.divide(np.abs(net), total, out=np.zeros(n), where=total > 0)
+    confidence = one_sided * (1.0 - np.exp(-total / 1.5))
+    labels = np.where(net > _MARGIN, "bullish", np.where(net < -_MARGIN, "bearish", "neutral"))
+    return labels.tolist(), confidence
+
+
+def in_holdout(text, rate=None) -> bool:
+    """True if the text belongs to the evaluation holdout (stable across runs)."""
+    rate = HOLDOUT_RATE if rate is None else rate
+    digest = hashlib.sha1((text or "").encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") < rate * 2 ** 32
+
+
+def _fast_summary(label, confidence):
+    """Format a local result like an LLM answer so extract_sentiment_keyword works."""
+    action = {
+        "bullish": "Positive headline; consider it alongside your own research.",
+        "bearish": "Negative headline; review your exposure.",
+        "neutral": "No clear direction; no action suggested.",
+    }[label]
+    return (
+        f"Sentiment: {label.title()}\n"
+        f"Suggested Action: {action} (local classifier, confidence {confidence:.2f})"
+    )
+
+
+def route(texts, ticker, llm=None, threshold=None):
+    """
+    Return one summary per text, in order. Texts the local classifier labels with
+    at least threshold confidence are answered locally, except for the holdout
+    sample; the rest are passed in one call to llm(texts, ticker), which
+    defaults to summarizer.summarize_all.
+    """
+    texts = list(texts)
+    if llm is None:
+        from summarizer import summarize_all as llm
+    if not ENABLED or not texts:
+        return llm(texts, ticker) if texts else []
+    threshold = THRESHOLD if threshold is None else threshold
+
+    labels, confidence = classify_batch(texts)
+    confident = confidence >= threshold
+    holdout = [i for i in np.flatnonzero(confident) if in_holdout(texts[i])]
+    confident[holdout] = False
+    results = [None] * len(texts)
+    escalate = [i for i in range(len(texts)) if not confident[i]]
+    for i in np.flatnonzero(confident):
+        results[i] = _fast_summary(labels[i], float(confidence[i]))
+    if escalate:
+        for i, summary in zip(escalate, llm([texts[i] for i in escalate], ticker)):
+            results[i] = summary
+
+    with _stats_lock:
+        _stats["articles"] += len(texts)
+        _stats["fast_path"] += len(texts) - len(escalate)
+        _stats["escalated"] += len(escalate)
+        _stats["holdout"] += len(holdout)
+    return results
+
+
+def router_stats() -> dict:
+    """Return counters for articles routed, answered locally, escalated and held out."""
+    with _stats_lock:
+        result = dict(_stats)
+    result["llm_calls_avoided"] = result["fast_path"]
+    return result
+
+
+def _load_labels(path):
+    import csv
+    with open(path, newline='') as f:
+        return [(row["text"], row["sentiment"].strip().lower()) for row in csv.DictReader(f)]
+
+
+def _load_cache_labels():
+    import summary_cache
+    from sentiment_utils import extract_sentiment_keyword
+    return [(text, extract_sentiment_keyword(summary)) for _, text, summary in summary_cache.iter_entries()]
+
+
+def evaluate(pairs, threshold=None) -> dict:
+    """
+    Score agreement of the local classifier with reference labels. pairs is a
+    list of (text, label). Reports overall agreement and agreement / coverage
+    on the subset that would be answered locally at the threshold, then the
+    same for the holdout sample only. When pairs come from the summary cache,
+    only the holdout_* figures are representative of routed traffic.
+    """
+    threshold = THRESHOLD if threshold is None else threshold
+    pairs = [(t, l) for t, l in pairs if l in ("bullish", "bearish", "neutral")]
+    if not pairs:
+        return {"examples": 0}
+    labels, confidence = classify_batch([t for t, _ in pairs])
+    truth = np.array([l for _, l in pairs])
+    predicted = np.array(labels)
+    confident = confidence >= threshold
+    agree = predicted == truth
+    holdout = np.array([in_holdout(t) for t, _ in pairs], dtype=bool)
+    held_confident = confident & holdout
+    return {
+        "examples": len(pairs),
+        "agreement": round(float(agree.mean()), 3),
+        "threshold": threshold,
+        "coverage": round(float(confident.mean()), 3),
+        "confident_agreement": round(float(agree[confident].mean()), 3) if confident.any() else None,
+        "holdout_examples": int(holdout.sum()),
+        "holdout_agreement": round(float(agree[holdout].mean()), 3) if holdout.any() else None,
+        "holdout_coverage": round(float(confident[holdout].mean()), 3) if holdout.any() else None,
+        "holdout_confident_agreement": (
+            round(float(agree[held_confident].mean()), 3) if held_confident.any() else None
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the local sentiment classifier.")
+    parser.add_argument("command", choices=["eval"])
+    parser.add_argument("--labels", help="CSV with 'text' and 'sentiment' columns")
+    parser.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args()
+    pairs = _load_labels(args.labels) if args.labels else _load_cache_labels()
+    for name, value in evaluate(pairs, args.threshold).items():
+        print(f"{name}: {value}")
+    if not args.labels:
+        print("note: the summary cache holds mostly escalated (low-confidence) articles; "
+              "use the holdout_* figures for the articles answered locally")
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared fetch layer for news_fetcher: one pooled keep-alive session, explicit
+# connect/read timeouts, conditional GET (ETag / If-Modified-Since) and a small
+# on-disk response cache with a per-URL TTL. Entries not refreshed for
+# HTTP_CACHE_MAX_AGE_DAYS are pruned, and the oldest go first once the cache
+# grows past HTTP_CACHE_MAX_MB.
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+CACHE_MAX_AGE = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "7")) * 86400
+CACHE_MAX_BYTES = int(float(os.getenv("HTTP_CACHE_MAX_MB", "200")) * 1024 * 1024)
+# Seconds between prune passes in one process
+PRUNE_INTERVAL = 600
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+
+_session = None
+_session_lock = threading.Lock()
+_pruned_at = 0.0
+_prune_lock = threading.Lock()
+
+
+class CachedResponse:
+    """Minimal response object returned by fetch()."""
+
+    def __init__(self, status_code, content, headers=None, from_cache=False, not_modified=False):
+        self.status_code = status_code
+        self.content = content or b""
+        self.headers = headers or {}
+        self.from_cache = from_cache
+        self.not_modified = not_modified
+        self.digest = hashlib.sha1(self.content).hexdigest()
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Accept-Encoding": "gzip, deflate",
+                "User-Agent": "market-sentiment-bot/1.0",
+            })
+            _session = session
+    return _session
+
+
+def _cache_paths(url):
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, name + ".json"), os.path.join(CACHE_DIR, name + ".body")
+
+
+def _load_cached(url):
+    meta_path, body_path = _cache_paths(url)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+        return meta, body
+    except (OSError, ValueError):
+        return None, None
+
+
+def _store_cached(url, meta, body=None):
+    """Write cache files atomically so concurrent readers never see partial data."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta_path, body_path = _cache_paths(url)
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    if body is not None:
+        with open(body_path + suffix, "wb") as f:
+            f.write(body)
+        os.replace(body_path + suffix, body_path)
+    with open(meta_path + suffix, "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + suffix, meta_path)
+    _maybe_prune()
+
+
+def _maybe_prune():
+    """Run prune_cache() at most once per PRUNE_INTERVAL in this process."""
+    global _pruned_at
+    now = time.time()
+    with _prune_lock:
+        if now - _pruned_at < PRUNE_INTERVAL:
+            return
+        _pruned_at = now
+    prune_cache(now=now)
+
+
+def prune_cache(max_age: float = None, max_bytes: int = None, now: float = None) -> int:
+    """
+    Delete cache entries whose metadata was last written more than max_age
+    seconds ago, then the oldest remaining ones until the cache is at most
+    max_bytes. Leftover temp files are removed too. Returns the entries removed.
+    """
+    max_age = CACHE_MAX_AGE if max_age is None else max_age
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    now = now or time.time()
+    entries = {}  # hash -> [newest mtime, total bytes, paths]
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if name.endswith(".tmp"):
+            # Abandoned by a writer that died mid-write
+            if now - st.st_mtime > 3600:
+                _unlink(path)
+            continue
+        entry = entries.setdefault(name.split(".", 1)[0], [0.0, 0, []])
+        entry[0] = max(entry[0], st.st_mtime)
+        entry[1] += st.st_size
+        entry[2].append(path)
+
+    removed = 0
+    total = sum(e[1] for e in entries.values())
+    for mtime, size, paths in sorted(entries.values()):
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        # Metadata first, so a concurrent reader sees a miss rather than a body without it
+        for path in sorted(paths, key=lambda p: not p.endswith(".json")):
+            _unlink(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _unlink(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def fetch(url: str, ttl: float = 0, timeout=None, use_cache: bool = True) -> CachedResponse:
+    """
+    GET the URL through the pooled session.
+
+    A cached copy younger than ttl seconds is returned without touching the
+    network. Otherwise the request carries the cached validators, and a 304
+    refreshes the cached copy. If the host fails, times out or answers with a
+    5xx error, a stale cached copy is served when one exists.
+    """
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    meta, body = _load_cached(url) if use_cache else (None, None)
+    now = time.time()
+    if meta and ttl and now - meta.get("fetched_at", 0) < ttl:
+        return CachedResponse(200, body, meta.get("headers"), from_cache=True)
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = get_session().get(url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        if meta:
+            print(f"Fetch failed, serving stale cache: {e}")
+            return CachedResponse(200, body, meta.get("headers"), from_cache=True)
+        return CachedResponse(599, b"", {}, from_cache=False)
+
+    if response.status_code >= 500 and meta:
+        print(f"Fetch returned {response.status_code}, serving stale cache")
+        return CachedResponse(200, body, meta.get("headers"), from_cache=True)
+
+    if response.status_code == 304 and meta:
+        meta["fetched_at"] = now
+        if use_cache:
+            _store_cached(url, meta)
+        return CachedResponse(200, body, meta.get("headers"), from_cache=True, not_modified=True)
+
+    kept_headers = {k: v for k, v in response.headers.items() if k.lower() in ("content-type", "date")}
+    if response.status_code == 200 and use_cache:
+        _store_cached(url, {
+            "fetched_at": now,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "headers": kept_headers,
+        }, response.content)
+    return CachedResponse(response.status_code, response.content, kept_headers)
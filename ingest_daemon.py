@@ -0,0 +1,266 @@
+"""
+Long-running ingestion service that keeps the stores fresh for the Streamlit pages.
+
+Usage:
+    python ingest_daemon.py [--tickers-file tickers.csv] [--workers 6]
+
+Every watchlist ticker is polled via NewsAPI and RSS, and the general market
+feed via RSS, each on its own interval (with jitter so polls do not line up).
+A failed poll is retried with exponential backoff. When several polls are due
+at once, sources with a lower priority number go first, and each source has
+its own concurrency limit. New articles are summarized, logged to the
+sentiment and processed stores, alerted to Telegram, and saved in
+ingest_store together with the poll outcome, which the pages display.
+"Refresh now" requests queued by the pages are picked up within a second.
+
+Intervals can be set per source with INGEST_<SOURCE>_INTERVAL (seconds).
+"""
+import os
+import time
+from datetime import date, timedelta
+import queue
+import heapq
+import random
+import signal
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from news_fetcher import iter_news_pages, prefetch, get_rss_news, get_rss_general_news
+from summarizer import summarize_many
+from article_pipeline import ingest_pages
+from telegram_alerts import send_telegram_message
+from ticker_matcher import get_matcher, load_watchlist
+import ingest_store
+import sentiment_scores
+import ticker_metadata
+import metrics
+
+# Relative jitter applied to every interval
+JITTER = float(os.getenv("INGEST_JITTER", "0.1"))
+# First retry after a failure, doubled per consecutive failure up to MAX_BACKOFF
+RETRY_BASE = float(os.getenv("INGEST_RETRY_BASE", "60"))
+MAX_BACKOFF = float(os.getenv("INGEST_MAX_BACKOFF", "3600"))
+# Seconds between watchlist reloads and between heartbeats
+WATCHLIST_RELOAD = 300
+HEARTBEAT_INTERVAL = 15
+# Seconds between checks for new sentiment swings to alert on
+SWING_CHECK_INTERVAL = float(os.getenv("INGEST_SWING_CHECK_INTERVAL", "300"))
+# Polls at startup are spread over this many seconds
+STARTUP_SPREAD = 30
+# The general feed is stored under this ticker, as on the news page
+GENERAL_TICKER = "market"
+
+
+def _interval(source_key: str, default: float) -> float:
+    return float(os.getenv(f"INGEST_{source_key.upper()}_INTERVAL", default))
+
+
+# Source key -> log label, fetcher (yielding article batches), poll interval,
+# priority (lower first), max concurrent polls
+SOURCES = {
+    "general": {"label": "rss", "fetch": lambda ticker: [get_rss_general_news(unprocessed_for="rss")],
+                "interval": _interval("general", 900), "priority": 0, "concurrency": 1},
+    "rss": {"label": "RSS", "fetch": lambda ticker: [get_rss_news(ticker, unprocessed_for="RSS")],
+            "interval": _interval("rss", 600), "priority": 1, "concurrency": 4},
+    # Pages are summarized while the next one downloads, until enough new articles were found
+    "newsapi": {"label": "NewsAPI", "fetch": lambda ticker: prefetch(iter_news_pages(ticker, unprocessed_for="NewsAPI")),
+                "interval": _interval("newsapi", 1800), "priority": 2, "concurrency": 2},
+}
+
+
+def poll(ticker: str, source_key: str) -> int:
+    """Fetch, summarize, log and store one ticker/source. Returns the number of new articles."""
+    spec = SOURCES[source_key]
+    general = source_key == "general"
+    records = ingest_pages(spec["fetch"](ticker), ticker, spec["label"], llm=summarize_many, tag_mentions=general)
+    ingest_store.save_articles(ticker, source_key, records)
+
+    alerts = [r for r in records if not r["duplicate_of"]]
+    if alerts and not general:
+        lines = [f"📰 ${ticker} ({spec['label']})", ""]
+        for r in alerts:
+            lines += [f"🔹 *{r['title']}*  ", f"🧠 {r['sentiment']}", ""]
+        send_telegram_message("\n".join(lines))
+    return len(records)
+
+
+def alert_swings() -> int:
+    """Send one Telegram alert listing the sentiment swings of today and yesterday not alerted yet."""
+    since = date.today() - timedelta(days=1)
+    lines = []
+    for row in sentiment_scores.swings(since_date=since).itertuples():
+        if not ingest_store.mark_swing_alerted(row.ticker, row.date.date().isoformat(), int(row.swing)):
+            continue
+        arrow = "📈" if row.swing > 0 else "📉"
+        lines.append(f"{arrow} *${row.ticker}* {row.date:%Y-%m-%d}: net {row.net:+.2f} "
+                     f"(z {row.z:+.1f}, EMA {row.ema:+.2f}, {row.total} articles)")
+    if lines:
+        send_telegram_message("\n".join(["⚡ Sentiment swings", ""] + lines))
+    return len(lines)
+
+
+class Scheduler:
+    """
+    Heap of (run_at, priority, seq, job) with one live entry per job; a job is a
+    (ticker, source_key) pair. Due jobs run on a thread pool, and completions
+    come back through a queue so all scheduling happens on the loop thread.
+    """
+
+    def __init__(self, tickers_file: str = "tickers.csv", workers: int = 6):
+        self.tickers_file = tickers_file
+        self._heap = []
+        self._seq = itertools.count()
+        self._run_at = {}      # job -> run_at of its live heap entry
+        self._running = set()
+        self._rerun = set()    # running jobs with a refresh requested meanwhile
+        self._failures = {}
+        self._active = {key: 0 for key in SOURCES}
+        self._done = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._stop = threading.Event()
+
+    def schedule(self, job, run_at: float):
+        self._run_at[job] = run_at
+        heapq.heappush(self._heap, (run_at, SOURCES[job[1]]["priority"], next(self._seq), job))
+
+    def _next_run(self, job, ok: bool) -> float:
+        now = time.time()
+        if ok:
+            self._failures.pop(job, None)
+            return now + SOURCES[job[1]]["interval"] * random.uniform(1 - JITTER, 1 + JITTER)
+        failures = self._failures[job] = self._failures.get(job, 0) + 1
+        return now + min(RETRY_BASE * 2 ** (failures - 1), MAX_BACKOFF) * random.uniform(1, 1 + JITTER)
+
+    def sync_watchlist(self):
+        """Add jobs for tickers new to the watchlist and drop removed ones."""
+        tickers = [t for t in load_watchlist(self.tickers_file) if t != "TICKER"]
+        get_matcher().update(tickers)
+        wanted = {(GENERAL_TICKER, "general")} | {(t, s) for t in tickers for s in ("rss", "newsapi")}
+        now = time.time()
+        for job in wanted - set(self._run_at) - self._running:
+            self.schedule(job, now + random.uniform(0, min(STARTUP_SPREAD, SOURCES[job[1]]["interval"])))
+        for job in set(self._run_at) - wanted:
+            del self._run_at[job]  # its heap entry is skipped when popped
+        return tickers
+
+    def _handle_refresh_requests(self):
+        now = time.time()
+        for ticker, source_key in ingest_store.pop_refresh_requests():
+            if source_key not in SOURCES:
+                continue
+            job = (ticker.upper() if source_key != "general" else GENERAL_TICKER, source_key)
+            if job in self._running:
+                self._rerun.add(job)
+            else:
+                self.schedule(job, now)
+
+    def _run(self, job):
+        ticker, source_key = job
+        try:
+            new_articles = poll(ticker, source_key)
+        except Exception as e:
+            print(f"Ingestion failed for {ticker} via {source_key}: {e}")
+            ingest_store.record_run(ticker, source_key, ok=False, error=str(e))
+            self._done.put((job, False))
+            return
+        ingest_store.record_run(ticker, source_key, ok=True, new_articles=new_articles)
+        self._done.put((job, True))
+
+    def _dispatch_due(self) -> bool:
+        """Start every due job its source has room for; returns True if some had to wait."""
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            run_at, _, _, job = entry
+            if self._run_at.get(job) == run_at:
+                due.append(entry)
+        # Highest priority first; jobs whose source is at its limit wait for a slot
+        deferred = False
+        for entry in sorted(due, key=lambda e: (e[1], e[0])):
+            job = entry[3]
+            source_key = job[1]
+            if self._active[source_key] >= SOURCES[source_key]["concurrency"]:
+                heapq.heappush(self._heap, entry)
+                deferred = True
+                continue
+            del self._run_at[job]
+            self._active[source_key] += 1
+            self._running.add(job)
+            self._pool.submit(self._run, job)
+        return deferred
+
+    def _collect(self, timeout: float):
+        """Wait up to timeout for finished jobs and reschedule them."""
+        try:
+            job, ok = self._done.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            self._active[job[1]] -= 1
+            self._running.discard(job)
+            if job in self._rerun:
+                self._rerun.discard(job)
+                self.schedule(job, time.time())
+            else:
+                self.schedule(job, self._next_run(job, ok))
+            try:
+                job, ok = self._done.get_nowait()
+            except queue.Empty:
+                return
+
+    def run_forever(self):
+        last_reload = last_beat = 0.0
+        last_swing_check = time.time()
+        while not self._stop.is_set():
+            now = time.time()
+            if now - last_reload >= WATCHLIST_RELOAD:
+                self.sync_watchlist()
+                last_reload = now
+            if now - last_beat >= HEARTBEAT_INTERVAL:
+                ingest_store.beat()
+                last_beat = now
+            if now - last_swing_check >= SWING_CHECK_INTERVAL:
+                try:
+                    alert_swings()
+                except Exception as e:
+                    print(f"Sentiment swing check failed: {e}")
+                last_swing_check = now
+            self._handle_refresh_requests()
+            if self._dispatch_due() or not self._heap:
+                wait = 1.0  # until a running poll frees a slot
+            else:
+                wait = min(1.0, max(0.0, self._heap[0][0] - time.time()))
+            self._collect(wait)
+        self._pool.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continuously ingest news sentiment for the watchlist.")
+    parser.add_argument("--tickers-file", default="tickers.csv", help="one ticker per line")
+    parser.add_argument("--workers", type=int, default=6, help="maximum concurrent polls across all sources")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    metrics.start_exporter()
+    scheduler = Scheduler(args.tickers_file, workers=args.workers)
+    tickers = scheduler.sync_watchlist()
+    warmed = ticker_metadata.warm_up(tickers)
+    print(f"Ticker metadata refreshed for {warmed} tickers")
+    print(f"Ingesting {len(tickers)} tickers and the general feed; press Ctrl+C to stop")
+    # Stop cleanly on SIGTERM too, so buffered log rows are flushed at exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
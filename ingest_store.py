@@ -0,0 +1,178 @@
+"""
+Shared state between the ingestion daemon and the Streamlit pages.
+
+The daemon writes the articles it ingested (with their summaries), the
+outcome of every poll and a heartbeat; the pages read them to render
+precomputed results with their freshness, and can queue "refresh now"
+requests for the daemon to pick up.
+"""
+import os
+import time
+import sqlite3
+import threading
+
+STATE_PATH = os.getenv("INGEST_STATE_PATH", "ingest_state.db")
+# The daemon counts as running if its heartbeat is younger than this
+HEARTBEAT_TIMEOUT = 60
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(STATE_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " ticker TEXT NOT NULL, source TEXT NOT NULL, url TEXT NOT NULL,"
+            " title TEXT, published_at TEXT, article_source TEXT, summary TEXT,"
+            " sentiment TEXT, duplicate_of TEXT, tickers TEXT, ingested_at REAL NOT NULL,"
+            " PRIMARY KEY (ticker, source, url));"
+            "CREATE INDEX IF NOT EXISTS idx_articles_recent ON articles(ticker, source, ingested_at);"
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " ticker TEXT NOT NULL, source TEXT NOT NULL, last_attempt REAL, last_success REAL,"
+            " failures INTEGER NOT NULL DEFAULT 0, last_error TEXT, new_articles INTEGER,"
+            " PRIMARY KEY (ticker, source));"
+            "CREATE TABLE IF NOT EXISTS refresh_requests ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, ticker TEXT NOT NULL, source TEXT NOT NULL,"
+            " requested_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS heartbeat (name TEXT PRIMARY KEY, ts REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS swing_alerts ("
+            " ticker TEXT NOT NULL, date TEXT NOT NULL, direction INTEGER NOT NULL, sent_at REAL NOT NULL,"
+            " PRIMARY KEY (ticker, date));"
+        )
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def save_articles(ticker: str, source: str, records):
+    """Store records as returned by article_pipeline.ingest_articles."""
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO articles (ticker, source, url, title, published_at, article_source,"
+            " summary, sentiment, duplicate_of, tickers, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(ticker, source.lower(), r["url"], r.get("title"), r.get("publishedAt"), r.get("source"),
+              r.get("summary"), r.get("sentiment"), r.get("duplicate_of"), ",".join(r.get("tickers") or ()), now)
+             for r in records],
+        )
+        conn.commit()
+
+
+def recent_articles(ticker: str, source: str, limit: int = 20) -> list:
+    """Most recently ingested articles for a ticker and source, newest first."""
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT url, title, published_at, article_source, summary, sentiment, duplicate_of, tickers, ingested_at"
+            " FROM articles WHERE ticker = ? AND source = ?"
+            " ORDER BY published_at DESC, ingested_at DESC LIMIT ?",
+            (ticker, source.lower(), limit),
+        ).fetchall()
+    keys = ("url", "title", "publishedAt", "source", "summary", "sentiment", "duplicate_of", "tickers", "ingested_at")
+    records = [dict(zip(keys, row)) for row in rows]
+    for r in records:
+        r["tickers"] = r["tickers"].split(",") if r["tickers"] else []
+    return records
+
+
+def record_run(ticker: str, source: str, ok: bool, error: str = None, new_articles: int = 0):
+    """Record the outcome of one poll of a ticker/source."""
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        if ok:
+            conn.execute(
+                "INSERT INTO runs (ticker, source, last_attempt, last_success, failures, last_error, new_articles)"
+                " VALUES (?, ?, ?, ?, 0, NULL, ?) ON CONFLICT (ticker, source) DO UPDATE SET"
+                " last_attempt = excluded.last_attempt, last_success = excluded.last_success,"
+                " failures = 0, last_error = NULL, new_articles = excluded.new_articles",
+                (ticker, source.lower(), now, now, new_articles),
+            )
+        else:
+            conn.execute(
+                "INSERT INTO runs (ticker, source, last_attempt, failures, last_error)"
+                " VALUES (?, ?, ?, 1, ?) ON CONFLICT (ticker, source) DO UPDATE SET"
+                " last_attempt = excluded.last_attempt, failures = failures + 1, last_error = excluded.last_error",
+                (ticker, source.lower(), now, error),
+            )
+        conn.commit()
+
+
+def freshness(ticker: str, source: str) -> dict:
+    """Return last_attempt / last_success timestamps, failure count and last error, or {}."""
+    with _lock:
+        row = _get_conn().execute(
+            "SELECT last_attempt, last_success, failures, last_error FROM runs WHERE ticker = ? AND source = ?",
+            (ticker, source.lower()),
+        ).fetchone()
+    if not row:
+        return {}
+    return dict(zip(("last_attempt", "last_success", "failures", "last_error"), row))
+
+
+def describe_freshness(ticker: str, source: str) -> str:
+    """Human-readable freshness line for a ticker/source, for the pages."""
+    info = freshness(ticker, source)
+    if not info.get("last_success"):
+        if info.get("failures"):
+            return f"Not ingested yet ({info['failures']} failed attempts: {info['last_error']})"
+        return "Not ingested yet"
+    age = int(time.time() - info["last_success"])
+    text = f"Updated {age // 60} min ago" if age >= 60 else f"Updated {age} s ago"
+    if info.get("failures"):
+        text += f" • last {info['failures']} attempts failed: {info['last_error']}"
+    return text
+
+
+def request_refresh(ticker: str, source: str):
+    """Ask the daemon to poll a ticker/source as soon as possible."""
+    with _lock:
+        conn = _get_conn()
+        conn.execute(
+            "INSERT INTO refresh_requests (ticker, source, requested_at) VALUES (?, ?, ?)",
+            (ticker, source.lower(), time.time()),
+        )
+        conn.commit()
+
+
+def pop_refresh_requests() -> list:
+    """Take all queued refresh requests as (ticker, source) pairs."""
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            rows = conn.execute("SELECT id, ticker, source FROM refresh_requests ORDER BY id").fetchall()
+            conn.executemany("DELETE FROM refresh_requests WHERE id = ?", [(r[0],) for r in rows])
+    return list(dict.fromkeys((r[1], r[2]) for r in rows))
+
+
+def mark_swing_alerted(ticker: str, day: str, direction: int) -> bool:
+    """Record a sentiment swing alert; False if one was already sent for the ticker and day."""
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO swing_alerts (ticker, date, direction, sent_at) VALUES (?, ?, ?, ?)",
+                (ticker, day, direction, time.time()),
+            )
+    return cur.rowcount == 1
+
+
+def beat(name: str = "ingest_daemon"):
+    """Record that the daemon is alive."""
+    with _lock:
+        conn = _get_conn()
+        conn.execute("INSERT OR REPLACE INTO heartbeat (name, ts) VALUES (?, ?)", (name, time.time()))
+        conn.commit()
+
+
+def daemon_alive(name: str = "ingest_daemon") -> bool:
+    """True if the ingestion daemon has sent a heartbeat recently."""
+    if not os.path.isfile(STATE_PATH):
+        return False
+    with _lock:
+        row = _get_conn().execute("SELECT ts FROM heartbeat WHERE name = ?", (name,)).fetchone()
+    return bool(row) and time.time() - row[0] < HEARTBEAT_TIMEOUT
@@ -0,0 +1,193 @@
+"""
+Market events from calendar_events.json and their effect on sentiment.
+
+Events are loaded once per change of the file into a DataFrame sorted by date,
+with the tickers each one affects: an explicit "tickers" list, else the
+watchlist tickers named in the event (e.g. "PLTR Earnings"), else none, which
+makes it a market-wide event (FOMC, CPI) that applies to every ticker. Each
+event has a pre window of EVENT_PRE_DAYS days before it and a post window of
+EVENT_POST_DAYS days from the event day on, kept in a sorted IntervalIndex.
+The watchlist matching depends on the matcher's terms, so the events are also
+reloaded after a ticker is added to it.
+
+impact() compares net sentiment ((bullish - bearish) / total) in the pre and
+post windows for every (event, ticker) pair. Windows are summed from
+per-ticker cumulative daily counts looked up with as-of joins at the window
+edges, so hundreds of events cost a few merges instead of a loop. Results are
+cached until the events, the matcher or the sentiment rollups change.
+"""
+import os
+import json
+import threading
+from datetime import date
+import sentiment_rollup
+import sentiment_scores
+from ticker_matcher import get_matcher
+
+EVENTS_PATH = os.getenv("EVENTS_PATH", "calendar_events.json")
+PRE_DAYS = int(os.getenv("EVENT_PRE_DAYS", "3"))
+POST_DAYS = int(os.getenv("EVENT_POST_DAYS", "3"))
+IMPACT_COLUMNS = [
+    "date", "event", "impact", "ticker", "scope",
+    "pre_articles", "pre_net", "post_articles", "post_net", "delta", "complete",
+]
+
+_lock = threading.Lock()
+_events = None   # (key, events DataFrame, windows IntervalIndex, ticker -> row positions)
+_impact = None   # (events key, rollup version, day, impact DataFrame)
+
+
+def _signature():
+    try:
+        st = os.stat(EVENTS_PATH)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _load(key, matcher):
+    import pandas as pd
+    signature = key[0]
+    raw = []
+    if signature is not None:
+        with open(EVENTS_PATH) as f:
+            raw = json.load(f)
+    rows = []
+    for event in raw:
+        tickers = event.get("tickers")
+        if tickers is None:
+            tickers = sorted(matcher.match(event.get("event") or ""))
+        rows.append({
+            "date": event.get("date"),
+            "event": event.get("event") or "",
+            "impact": event.get("impact") or "",
+            "tickers": [t.upper() for t in tickers],
+        })
+    events = pd.DataFrame(rows, columns=["date", "event", "impact", "tickers"])
+    events["date"] = pd.to_datetime(events["date"], errors="coerce")
+    events = events.dropna(subset=["date"]).sort_values(["date", "event"]).reset_index(drop=True)
+    events["pre_start"] = events["date"] - pd.Timedelta(days=PRE_DAYS)
+    events["post_end"] = events["date"] + pd.Timedelta(days=POST_DAYS - 1)
+    windows = pd.IntervalIndex.from_arrays(events["pre_start"], events["post_end"], closed="both")
+    by_ticker = {}
+    for pos, tickers in enumerate(events["tickers"]):
+        for t in tickers:
+            by_ticker.setdefault(t, []).append(pos)
+    return key, events, windows, by_ticker
+
+
+def _get_events():
+    """The indexed events, reloaded when the file or the matcher's terms changed."""
+    global _events
+    matcher = get_matcher()
+    # Read the version before loading, so a ticker added meanwhile triggers another load
+    key = (_signature(), matcher.version)
+    with _lock:
+        if _events is None or _events[0] != key:
+            _events = _load(key, matcher)
+        return _events
+
+
+def events(ticker: str = None):
+    """All events sorted by date (date, event, impact, tickers, pre_start, post_end); only those affecting ticker if given."""
+    _, df, _, by_ticker = _get_events()
+    if ticker is None:
+        return df.copy()
+    # Market-wide events affect every ticker
+    positions = sorted(set(by_ticker.get(ticker.upper(), [])) | set(df.index[df["tickers"].str.len() == 0]))
+    return df.iloc[positions].copy()
+
+
+def upcoming(days: int = 30, from_date: date = None):
+    """Events from from_date (default today) up to days ahead."""
+    import pandas as pd
+    _, df, _, _ = _get_events()
+    start = pd.Timestamp(from_date or date.today())
+    lo, hi = df["date"].searchsorted([start, start + pd.Timedelta(days=days)], side="left")
+    return df.iloc[lo:hi].copy()
+
+
+def active(day: date = None):
+    """Events whose pre or post window covers day (default today)."""
+    import pandas as pd
+    _, df, windows, _ = _get_events()
+    if df.empty:
+        return df.copy()
+    return df[windows.contains(pd.Timestamp(day or date.today()))].copy()
+
+
+def _cumulative_counts():
+    """Running bullish, bearish and total counts per ticker over the days with articles."""
+    counts = sentiment_scores.scores(observed_only=True)[["date", "ticker", "bullish", "bearish", "total"]]
+    counts = counts.sort_values(["ticker", "date"])
+    counts[["bullish", "bearish", "total"]] = counts.groupby("ticker")[["bullish", "bearish", "total"]].cumsum()
+    return counts.sort_values("date").reset_index(drop=True)
+
+
+def _asof(pairs, cum, column: str):
+    """Cumulative counts per pair as of the date in pairs[column] (zero before a ticker's first article)."""
+    import pandas as pd
+    left = pairs[["pair", "ticker", column]].sort_values(column)
+    merged = pd.merge_asof(left, cum, left_on=column, right_on="date", by="ticker", direction="backward")
+    merged = merged.set_index("pair")[["bullish", "bearish", "total"]].fillna(0)
+    return merged.reindex(pairs["pair"]).to_numpy()
+
+
+def _compute_impact(df):
+    import numpy as np
+    import pandas as pd
+    cum = _cumulative_counts()
+    if df.empty or cum.empty:
+        return pd.DataFrame(columns=IMPACT_COLUMNS)
+
+    # One row per (event, ticker); market-wide events pair with every ticker that has sentiment
+    specific = df[df["tickers"].str.len() > 0].explode("tickers").rename(columns={"tickers": "ticker"})
+    specific["scope"] = "ticker"
+    market = df[df["tickers"].str.len() == 0].drop(columns="tickers").merge(
+        pd.DataFrame({"ticker": cum["ticker"].unique()}), how="cross")
+    market["scope"] = "market"
+    pairs = pd.concat([specific, market], ignore_index=True)
+    pairs["pair"] = np.arange(len(pairs))
+    pairs["before_pre"] = pairs["pre_start"] - pd.Timedelta(days=1)
+    pairs["before_event"] = pairs["date"] - pd.Timedelta(days=1)
+
+    start = _asof(pairs, cum, "before_pre")
+    middle = _asof(pairs, cum, "before_event")
+    end = _asof(pairs, cum, "post_end")
+    pre, post = middle - start, end - middle
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pre_net = np.where(pre[:, 2] > 0, (pre[:, 0] - pre[:, 1]) / pre[:, 2], np.nan)
+        post_net = np.where(post[:, 2] > 0, (post[:, 0] - post[:, 1]) / post[:, 2], np.nan)
+    pairs["pre_articles"] = pre[:, 2].astype(int)
+    pairs["pre_net"] = pre_net
+    pairs["post_articles"] = post[:, 2].astype(int)
+    pairs["post_net"] = post_net
+    pairs["delta"] = post_net - pre_net
+    pairs["complete"] = pairs["post_end"] < pd.Timestamp(date.today())
+    return pairs[IMPACT_COLUMNS].sort_values(["date", "event", "ticker"]).reset_index(drop=True)
+
+
+def impact(tickers=None, start_date: date = None, min_articles: int = 1):
+    """
+    Pre- vs post-event net sentiment per (event, ticker) as a DataFrame with
+    IMPACT_COLUMNS. Pairs with fewer than min_articles articles in either
+    window are left out; delta is post_net - pre_net.
+    """
+    import pandas as pd
+    global _impact
+    events_key, df, _, _ = _get_events()
+    # "complete" depends on the day too
+    key = (events_key, sentiment_rollup.version(), date.today())
+    with _lock:
+        cached = _impact
+    if cached is None or cached[:3] != key:
+        result = _compute_impact(df)
+        with _lock:
+            _impact = cached = key + (result,)
+    result = cached[3]
+    mask = (result["pre_articles"] >= min_articles) & (result["post_articles"] >= min_articles)
+    if tickers is not None:
+        mask &= result["ticker"].isin(list(tickers))
+    if start_date is not None:
+        mask &= result["date"] >= pd.Timestamp(start_date)
+    return result[mask].reset_index(drop=True)
@@ -0,0 +1,250 @@
+"""
+Lightweight in-process metrics: counters, histograms and timing spans.
+
+Stages of the fetch -> summarize -> log pipeline are wrapped in
+span("stage", **labels), which records into the pipeline_stage_seconds
+histogram and keeps the most recent samples for the in-app panel. Metrics are
+rendered in the Prometheus text format, served on METRICS_PORT and/or written
+to METRICS_TEXTFILE (for node_exporter's textfile collector).
+
+Everything is off unless METRICS_ENABLED=1 (or enable() is called); disabled,
+each call is a single flag check and span() returns a shared no-op.
+"""
+import os
+import time
+import atexit
+import threading
+from collections import deque
+
+
+def _enabled_in_env() -> bool:
+    return os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+
+
+ENABLED = _enabled_in_env()
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 500
+STAGE_METRIC = "pipeline_stage_seconds"
+
+HELP = {
+    STAGE_METRIC: "Time spent in each pipeline stage",
+    "http_requests_total": "HTTP requests by source and status code",
+    "llm_tokens_total": "LLM tokens by direction (prompt / completion)",
+    "llm_calls_total": "LLM requests by mode and outcome",
+    "telegram_messages_total": "Telegram sends by outcome",
+    "articles_filtered_total": "Articles kept or dropped by the relevance filter",
+    "newsapi_fallbacks_total": "NewsAPI lookups answered from RSS after the quota ran out",
+    "rss_feeds_total": "RSS feeds parsed, or reused because the body was unchanged",
+}
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_recent = deque(maxlen=RECENT_SAMPLES)  # (timestamp, stage, labels, seconds)
+_exporter_started = False
+
+
+def enable(on: bool = True):
+    global ENABLED
+    ENABLED = on
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Add value to a counter."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, **labels):
+    """Record one observation in a histogram."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                hist[i] += 1
+        hist[-2] += value
+        hist[-1] += 1
+
+
+class _Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        labels = dict(self.labels, stage=self.stage)
+        if exc_type is not None:
+            labels["error"] = exc_type.__name__
+        observe(STAGE_METRIC, elapsed, **labels)
+        _recent.append((time.time(), self.stage, self.labels, elapsed))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage: str, **labels):
+    """Context manager timing one pipeline stage."""
+    if not ENABLED:
+        return _NOOP
+    return _Span(stage, labels)
+
+
+def recent(stage: str = None) -> list:
+    """Recent span samples as (timestamp, stage, labels, seconds), oldest first."""
+    samples = list(_recent)
+    return [s for s in samples if s[1] == stage] if stage else samples
+
+
+def stage_summary() -> list:
+    """Per stage (and labels): sample count, p50 / p95 / last latency in ms over recent samples."""
+    groups = {}
+    for _, stage, labels, seconds in list(_recent):
+        groups.setdefault((stage, tuple(sorted(labels.items()))), []).append(seconds)
+    rows = []
+    for (stage, labels), values in sorted(groups.items()):
+        ordered = sorted(values)
+        rows.append({
+            "stage": stage,
+            "labels": ", ".join(f"{k}={v}" for k, v in labels),
+            "samples": len(values),
+            "p50_ms": round(ordered[(len(ordered) - 1) // 2] * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            "last_ms": round(values[-1] * 1000, 1),
+        })
+    return rows
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(hist)) for key, hist in _histograms.items())
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), hist in histograms:
+        if name not in seen:
+            seen.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, count in zip(BUCKETS, hist):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist[-1]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist[-2]:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str):
+    """Write the current metrics atomically to path."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+def serve(port: int, host: str = "0.0.0.0"):
+    """Serve /metrics on a background thread."""
+    # Imported here so that instrumented modules do not pay for http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def _write_periodically(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_textfile(path)
+        except OSError as e:
+            print(f"Could not write metrics to {path}: {e}")
+
+
+def start_exporter():
+    """
+    Start the exporters configured in the environment, once per process:
+    METRICS_PORT serves /metrics, METRICS_TEXTFILE is rewritten every
+    METRICS_TEXTFILE_INTERVAL seconds and at exit. No-op while disabled.
+    The environment is checked again here, after .env files have been loaded.
+    """
+    global _exporter_started, ENABLED
+    ENABLED = ENABLED or _enabled_in_env()
+    with _lock:
+        if _exporter_started or not ENABLED:
+            return
+        _exporter_started = True
+    port = os.getenv("METRICS_PORT")
+    if port:
+        try:
+            serve(int(port))
+        except OSError as e:
+            print(f"Metrics endpoint not started on port {port}: {e}")
+    path = os.getenv("METRICS_TEXTFILE")
+    if path:
+        interval = float(os.getenv("METRICS_TEXTFILE_INTERVAL", "15"))
+        threading.Thread(target=_write_periodically, args=(path, interval),
+                         name="metrics-textfile", daemon=True).start()
+        atexit.register(write_textfile, path)
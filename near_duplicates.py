@@ -0,0 +1,133 @@
+"""
+Near-duplicate article detection with MinHash signatures and LSH banding.
+
+The same story often arrives through NewsAPI mirrors and Yahoo RSS under
+different URLs. MinHash signatures of the normalized title + description
+(word unigrams and bigrams) are kept in a persistent SQLite index together with
+the canonical article's summary, so a near-duplicate can reuse it instead of
+being summarized and logged again. Candidates are found through LSH bands and
+confirmed by their estimated Jaccard similarity.
+"""
+import os
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+INDEX_PATH = os.getenv("NEAR_DUP_INDEX_PATH", "near_duplicates.db")
+# Estimated Jaccard similarity at which two articles count as the same story
+THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+RETENTION_SECONDS = float(os.getenv("NEAR_DUP_RETENTION_DAYS", "14")) * 86400
+NUM_PERM = 64
+BANDS, ROWS = 16, 4  # candidate threshold about (1/16) ** (1/4) = 0.5
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "by", "with", "at", "is", "its"}
+
+_conn = None
+_lock = threading.Lock()
+_last_evict = 0.0
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(INDEX_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, ticker TEXT, minhash BLOB NOT NULL,"
+            " url TEXT, source TEXT, summary TEXT, created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band_key TEXT NOT NULL, sig_id INTEGER NOT NULL, ticker TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bands_key ON bands(ticker, band_key)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_signatures_created ON signatures(created_at)")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def normalize(title: str, description: str) -> list:
+    """Lower-case word tokens of title + description without stopwords or markup."""
+    text = re.sub(r"<[^>]+>", " ", f"{title or ''} {description or ''}".lower())
+    return [t for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS]
+
+
+def minhash(tokens):
+    """MinHash signature (NUM_PERM values) over word unigrams and bigrams, or None if empty."""
+    shingles = set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+    if not shingles:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+              for s in shingles]
+    return array("Q", [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS])
+
+
+def signature(title: str, description: str):
+    return minhash(normalize(title, description))
+
+
+def similarity(sig_a, sig_b) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def _band_keys(sig):
+    return [
+        f"{i}:" + hashlib.blake2b(sig[i * ROWS:(i + 1) * ROWS].tobytes(), digest_size=8).hexdigest()
+        for i in range(BANDS)
+    ]
+
+
+def find_duplicate(sig, ticker: str):
+    """
+    Return the canonical entry (dict with url, source, summary) of a stored
+    article for the same ticker that is at least THRESHOLD similar, or None.
+    """
+    if sig is None:
+        return None
+    keys = _band_keys(sig)
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT s.minhash, s.url, s.source, s.summary FROM signatures s"
+            " WHERE s.created_at >= ? AND s.id IN ("
+            f"  SELECT sig_id FROM bands WHERE ticker = ? AND band_key IN ({','.join('?' * len(keys))}))"
+            " ORDER BY s.id",
+            [time.time() - RETENTION_SECONDS, ticker] + keys,
+        ).fetchall()
+    for blob, url, source, summary in rows:
+        if similarity(sig, array("Q", blob)) >= THRESHOLD:
+            return {"url": url, "source": source, "summary": summary}
+    return None
+
+
+def record(sig, ticker: str, url: str, source: str, summary: str):
+    """Store a canonical article's signature and summary; evicts expired entries hourly."""
+    global _last_evict
+    if sig is None:
+        return
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        cur = conn.execute(
+            "INSERT INTO signatures (ticker, minhash, url, source, summary, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (ticker, sig.tobytes(), url, source, summary, now),
+        )
+        conn.executemany(
+            "INSERT INTO bands (band_key, sig_id, ticker) VALUES (?, ?, ?)",
+            [(key, cur.lastrowid, ticker) for key in _band_keys(sig)],
+        )
+        if now - _last_evict > 3600:
+            cutoff = now - RETENTION_SECONDS
+            conn.execute("DELETE FROM bands WHERE sig_id IN (SELECT id FROM signatures WHERE created_at < ?)", (cutoff,))
+            conn.execute("DELETE FROM signatures WHERE created_at < ?", (cutoff,))
+            _last_evict = now
+        conn.commit()
@@ -1,159 +1,281 @@
 from dotenv import load_dotenv
 load_dotenv()
-import requests
 import os
 from datetime import date, timedelta, datetime
-from urllib.parse import quote_plus
-import re
-import feedparser
+import queue
+import threading
+from http_client import fetch
+import newsapi_client
+import rss_stream
+from processed_store import filter_unprocessed, is_processed
+from ticker_metadata import get_company_name
+from ticker_matcher import get_matcher
+import metrics
 
-def get_news(ticker):
-    API_KEY = os.getenv("NEWS_API_KEY", "")
-    # Restrict news to the past 7 days
-    start_date = (date.today() - timedelta(days=7)).isoformat()
-    # Build search query combining ticker and company name for broader relevance
-    try:
-        info = yf.Ticker(ticker).info
-        company_name = info.get("longName") or info.get("shortName") or ""
-    except Exception:
-        company_name = ""
-    # Only add company name if it's different than the ticker
+# Per-URL cache TTL (seconds) for RSS feeds in the shared fetch layer
+RSS_TTL = int(os.getenv("RSS_CACHE_TTL", "300"))
+# Yahoo Finance feed host (overridable to point at a local stand-in)
+YAHOO_RSS_BASE_URL = os.getenv("YAHOO_RSS_BASE_URL", "https://feeds.finance.yahoo.com")
+# NewsAPI paging: articles per page, pages per lookup, and relevant articles wanted
+NEWSAPI_PAGE_SIZE = int(os.getenv("NEWSAPI_PAGE_SIZE", "20"))
+NEWSAPI_MAX_PAGES = int(os.getenv("NEWSAPI_MAX_PAGES", "3"))
+NEWSAPI_WANTED = int(os.getenv("NEWSAPI_WANTED", "6"))
+# NewsAPI does not page past this many results on the developer plan
+NEWSAPI_MAX_RESULTS = int(os.getenv("NEWSAPI_MAX_RESULTS", "100"))
+
+# Entries per RSS feed and how far back they may go
+RSS_LIMIT = 10
+RSS_MAX_AGE = timedelta(days=7)
+# Source label of articles served by the RSS fallback when the NewsAPI quota is spent;
+# they carry it in article["via"] so callers log and mark them under it
+FALLBACK_SOURCE = "RSS"
+
+# Last parse per (feed URL, unprocessed_for): (body digest, selected items, complete)
+_parsed_feeds = {}
+_parsed_feeds_lock = threading.Lock()
+
+def _feedparser_items(content):
+    """Items of a feed parsed with feedparser, in the shape of rss_stream.iter_items."""
+    # Only needed for feeds that are not well-formed XML, so imported on first use
+    import feedparser
+    for entry in feedparser.parse(content).entries:
+        parsed = entry.get("published_parsed")
+        yield {
+            "title": entry.get("title"),
+            "link": entry.get("link"),
+            "summary": entry.get("summary") or entry.get("description") or "",
+            "published": datetime(*parsed[:6]) if parsed else None,
+        }
+
+def fetch_feed_items(url, limit=RSS_LIMIT, unprocessed_for=None):
+    """
+    Fetch an RSS feed through the pooled, conditional-GET fetch layer and return
+    up to limit items from the last 7 days, parsed incrementally from the raw
+    bytes (see rss_stream). With unprocessed_for (a source label), items whose
+    link was already processed for that source are skipped and do not count.
+    An unchanged feed (304 Not Modified or a cache hit) is not parsed again:
+    the previous selection is reused, minus items processed since.
+    """
+    with metrics.span("http_fetch", source="rss"):
+        response = fetch(url, ttl=RSS_TTL)
+    metrics.inc("http_requests_total", source="rss", status=response.status_code)
+    if response.status_code != 200:
+        return []
+    cutoff = datetime.utcnow() - RSS_MAX_AGE
+    skip = (lambda link: is_processed(link, unprocessed_for)) if unprocessed_for else None
+    key = (url, unprocessed_for)
+    with _parsed_feeds_lock:
+        previous = _parsed_feeds.get(key)
+    if previous is not None and previous[0] == response.digest:
+        items = [item for item in previous[1]
+                 if item["published"] >= cutoff and not (skip and item["link"] and skip(item["link"]))]
+        # Enough left, or the last parse already reached the end of the window
+        if previous[2] or len(items) >= limit:
+            metrics.inc("rss_feeds_total", outcome="unchanged")
+            return items[:limit]
+    with metrics.span("rss_parse"):
+        try:
+            items = list(rss_stream.select(rss_stream.iter_items(response.content), cutoff, limit, skip))
+        except rss_stream.ParseError:
+            # Not well-formed XML (e.g. HTML entities); feedparser is lenient
+            items = list(rss_stream.select(_feedparser_items(response.content), cutoff, limit, skip))
+    metrics.inc("rss_feeds_total", outcome="parsed")
+    with _parsed_feeds_lock:
+        _parsed_feeds[key] = (response.digest, items, len(items) < limit)
+    return items
+
+def _rss_articles(items, source):
+    # Use the RSS summary as the description for GPT summarization
+    return [{
+        "title": item["title"],
+        "url": item["link"],
+        "description": item["summary"],
+        "publishedAt": item["published"].isoformat(),
+        "source": source,
+    } for item in items]
+
+def _as_fallback(articles):
+    for article in articles:
+        article["via"] = FALLBACK_SOURCE
+    return articles
+
+def build_news_query(ticker, company_name=""):
+    """Build the NewsAPI search query for a ticker and its company name."""
     # Restrict search to the ticker followed by 'stock' to reduce irrelevant results
     query = f'"{ticker} stock"'
+    # Only add company name if it's different than the ticker
     if company_name and company_name.upper() != ticker.upper():
         query += f' OR "{company_name}"'
-    # URL-encode the query
-    encoded_query = quote_plus(query)
-    url = (
-        f"https://newsapi.org/v2/everything?q={encoded_query}"
-        f"&apiKey={API_KEY}"
-        f"&from={start_date}"  # last 7 days
-        f"&sortBy=publishedAt&language=en"
-        f"&pageSize=6&excludeDomains=yahoo.com"
-    )
-    
-    response = requests.get(url)
-    print("DEBUG: NewsAPI response code:", response.status_code)
-    print("DEBUG: NewsAPI response:", response.text)
+    return query
 
-    if response.status_code != 200:
-        return []
-    
-    data = response.json()
-    articles = []
-    for item in data.get("articles", []):
-        articles.append({
-            "title": item["title"],
-            "url": item["url"],
-            "description": item["description"],
-            "publishedAt": item["publishedAt"],
-            "source": item["source"]["name"]
-        })
-    # Compile regex for exact ticker/company name matches
-    pattern_parts = [re.escape(ticker)]
-    if company_name:
-        pattern_parts.append(re.escape(company_name))
-    pattern = r"\b(?:" + "|".join(pattern_parts) + r")\b"
-    regex = re.compile(pattern, re.IGNORECASE)
-    # Filter to only articles matching full-word ticker or company name
-    relevant = []
-    for art in articles:
-        text = (art.get('title', '') + ' ' + (art.get('description') or ''))
-        if regex.search(text):
-            relevant.append(art)
-    return relevant
+def _newsapi_article(item):
+    return {
+        "title": item.get("title"),
+        "url": item.get("url"),
+        "description": item.get("description"),
+        "publishedAt": item.get("publishedAt"),
+        "source": (item.get("source") or {}).get("name"),
+    }
+
+def _iter_newsapi_pages(query, start_date, keep, wanted, max_pages, unprocessed_for):
+    """
+    Page through /v2/everything lazily, yielding the kept articles of each page
+    (only those not yet processed for unprocessed_for, if given). Stops once
+    wanted articles were yielded, the results or max_pages are exhausted, or the
+    quota runs out. Raises QuotaExhausted only if the first page cannot be had.
+    """
+    found = 0
+    for page in range(1, max_pages + 1):
+        if (page - 1) * NEWSAPI_PAGE_SIZE >= NEWSAPI_MAX_RESULTS:
+            return
+        try:
+            data = newsapi_client.search(query, start_date, page_size=NEWSAPI_PAGE_SIZE, page=page,
+                                         excludeDomains="yahoo.com")
+        except newsapi_client.QuotaExhausted:
+            if page == 1:
+                raise
+            return
+        if data is None:
+            return
+        items = data.get("articles", [])
+        articles = keep([_newsapi_article(item) for item in items])
+        if unprocessed_for:
+            new_urls = set(filter_unprocessed([a["url"] for a in articles if a.get("url")], unprocessed_for))
+            articles = [a for a in articles if a.get("url") in new_urls]
+        articles = articles[:wanted - found]
+        if articles:
+            found += len(articles)
+            yield articles
+        if found >= wanted or len(items) < NEWSAPI_PAGE_SIZE \
+                or page * NEWSAPI_PAGE_SIZE >= data.get("totalResults", 0):
+            return
+
+def iter_news_pages(ticker, wanted=None, max_pages=None, unprocessed_for=None):
+    """
+    Yield NewsAPI articles relevant to the ticker page by page, as each page
+    arrives, until wanted relevant articles were found (see _iter_newsapi_pages).
+    With unprocessed_for (a source label such as "NewsAPI"), articles already
+    processed for that source are skipped and do not count. Falls back to Yahoo
+    RSS if the NewsAPI budget is spent before the first page; those articles
+    have article["via"] set to FALLBACK_SOURCE and are checked against it.
+    """
+    # Restrict news to the past 7 days
+    start_date = (date.today() - timedelta(days=7)).isoformat()
+    # Build search query combining ticker and company name (from the metadata cache)
+    company_name = get_company_name(ticker)
+    query = build_news_query(ticker, company_name)
+    # Filter to only articles mentioning the ticker, a cashtag or the company name,
+    # using the watchlist-wide matcher (the ticker is added if not yet known)
+    matcher = get_matcher()
+    matcher.add_ticker(ticker, company_name)
+
+    def relevant(articles):
+        kept = []
+        with metrics.span("relevance_filter", source="newsapi"):
+            for art in articles:
+                text = ((art.get('title') or '') + ' ' + (art.get('description') or ''))
+                if ticker.upper() in matcher.match(text):
+                    kept.append(art)
+        metrics.inc("articles_filtered_total", len(kept), outcome="kept")
+        metrics.inc("articles_filtered_total", len(articles) - len(kept), outcome="dropped")
+        return kept
+
+    pages = _iter_newsapi_pages(query, start_date, relevant, wanted or NEWSAPI_WANTED,
+                                max_pages or NEWSAPI_MAX_PAGES, unprocessed_for)
+    try:
+        yield next(pages)
+    except StopIteration:
+        return
+    except newsapi_client.QuotaExhausted as e:
+        # Out of NewsAPI budget and nothing cached: degrade to Yahoo RSS
+        print(f"{e}; falling back to RSS for {ticker}")
+        metrics.inc("newsapi_fallbacks_total", scope="ticker")
+        articles = _as_fallback(get_rss_news(ticker, unprocessed_for=FALLBACK_SOURCE if unprocessed_for else None))
+        if articles:
+            yield articles
+        return
+    yield from pages
+
+def get_news(ticker):
+    """
+    Up to NEWSAPI_WANTED relevant NewsAPI articles for the ticker, paging as
+    needed (RSS articles tagged with "via" if the quota is spent).
+    """
+    return [article for page in iter_news_pages(ticker) for article in page]
 
 def get_general_news():
     """
     Fetch general stock market news for the past 7 days using a broad query.
     """
-    API_KEY = os.getenv("NEWS_API_KEY", "")
     # Fetch news from the last 7 days
     start_date = (date.today() - timedelta(days=7)).isoformat()
     # Broad market news query
     query = "stock market OR S&P OR earnings OR investors OR markets"
-    encoded_query = quote_plus(query)
-    url = (
-        f"https://newsapi.org/v2/everything?q={encoded_query}"
-        f"&apiKey={API_KEY}"
-        f"&from={start_date}"  # last 7 days
-        f"&sortBy=publishedAt&language=en"
-        f"&pageSize=6&excludeDomains=yahoo.com"
-    )
-    response = requests.get(url)
-    if response.status_code != 200:
-        return []
-    data = response.json()
-    articles = []
-    for item in data.get("articles", []):
-        articles.append({
-            "title": item.get("title"),
-            "url": item.get("url"),
-            "description": item.get("description"),
-            "publishedAt": item.get("publishedAt"),
-            "source": item.get("source", {}).get("name")
-        })
-    return articles
+    try:
+        pages = list(_iter_newsapi_pages(query, start_date, lambda articles: articles,
+                                         NEWSAPI_WANTED, 1, None))
+    except newsapi_client.QuotaExhausted as e:
+        print(f"{e}; falling back to RSS for general news")
+        metrics.inc("newsapi_fallbacks_total", scope="general")
+        return _as_fallback(get_rss_general_news())
+    return [article for page in pages for article in page]
 
-def get_rss_news(ticker):
+def prefetch(pages, depth=1):
     """
-    Fetch headlines via Yahoo Finance RSS for the given ticker.
+    Iterate pages on a background thread, keeping up to depth pages ready, so
+    that the consumer can process one page while the next is downloading.
+    Errors raised by the producer are re-raised to the consumer.
     """
-    feed = feedparser.parse(
-        f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker}&region=US&lang=en-US"
-    )
-    articles = []
-    # Only include articles from the last 7 days
-    cutoff = datetime.utcnow() - timedelta(days=7)
-    for entry in feed.entries:
-        parsed = entry.get("published_parsed")
-        if not parsed:
-            continue
-        dt = datetime(*parsed[:6])
-        # Exclude articles older than 7 days
-        if dt < cutoff:
-            continue
-        # Use the RSS summary as the description for GPT summarization
-        desc = entry.get("summary") or entry.get("description") or ""
-        articles.append({
-            "title": entry.get("title"),
-            "url": entry.get("link"),
-            "description": desc,
-            "publishedAt": dt.isoformat(),
-            "source": "Yahoo Finance RSS"
-        })
-    # Return only the first 10 relevant articles
-    return articles[:10]
+    ready = queue.Queue(maxsize=depth)
+    stop = threading.Event()
 
-import feedparser
-from datetime import datetime, timedelta
+    def put(entry):
+        while not stop.is_set():
+            try:
+                ready.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
 
-import feedparser
-from datetime import datetime, timedelta
+    def produce():
+        try:
+            for page in pages:
+                if not put((True, page)):
+                    return
+            put((False, None))
+        except Exception as e:
+            put((False, e))
 
-def get_rss_general_news():
+    threading.Thread(target=produce, name="news-prefetch", daemon=True).start()
+    try:
+        while True:
+            more, value = ready.get()
+            if not more:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stop.set()
+
+def get_rss_news(ticker, unprocessed_for=None):
     """
-    Fetch general stock market news from Yahoo Finance RSS (^GSPC) for the past 7 days.
+    Fetch up to 10 headlines from the last 7 days via Yahoo Finance RSS for the
+    given ticker, optionally skipping links already processed for unprocessed_for.
     """
-    url_feed = "https://feeds.finance.yahoo.com/rss/2.0/headline?s=%5EDJI&region=US&lang=en-US"
-    feed = feedparser.parse(url_feed)
-    articles = []
-    cutoff = datetime.utcnow() - timedelta(days=7)
-
-    for entry in feed.entries:
-        parsed = entry.get("published_parsed")
-        if not parsed:
-            continue
-        dt = datetime(*parsed[:6])
-        if dt < cutoff:
-            continue
-        desc = entry.get("summary") or entry.get("description") or ""
-        articles.append({
-            "title": entry.get("title"),
-            "url": entry.get("link"),
-            "description": desc,
-            "publishedAt": dt.isoformat(),
-            "source": "Yahoo Finance (^GSPC)"
-        })
+    items = fetch_feed_items(
+        f"{YAHOO_RSS_BASE_URL}/rss/2.0/headline?s={ticker}&region=US&lang=en-US",
+        unprocessed_for=unprocessed_for,
+    )
+    return _rss_articles(items, "Yahoo Finance RSS")
 
-    return articles[:10]
+def get_rss_general_news(unprocessed_for=None):
+    """
+    Fetch general stock market news from Yahoo Finance RSS (^GSPC) for the past 7 days.
+    """
+    items = fetch_feed_items(
+        f"{YAHOO_RSS_BASE_URL}/rss/2.0/headline?s=%5EDJI&region=US&lang=en-US",
+        unprocessed_for=unprocessed_for,
+    )
+    return _rss_articles(items, "Yahoo Finance (^GSPC)")
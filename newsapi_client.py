@@ -0,0 +1,172 @@
+"""
+Quota-aware NewsAPI client with a response cache shared across sessions.
+
+Every /v2/everything lookup goes through search(). Responses are cached per
+(query, from-date, paging) in SQLite with a TTL, so repeated lookups of the
+same ticker by different Streamlit sessions or batch jobs cost one API call.
+The daily request budget is tracked in the same shared store; when it runs low
+search() serves stale cached responses or raises QuotaExhausted so callers can
+fall back to RSS.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from http_client import fetch
+import metrics
+
+DB_PATH = os.getenv("NEWSAPI_CACHE_PATH", "newsapi_cache.db")
+BASE_URL = os.getenv("NEWSAPI_BASE_URL", "https://newsapi.org")
+DAILY_QUOTA = int(os.getenv("NEWSAPI_DAILY_QUOTA", "100"))
+# Below this many remaining requests only cached responses are served
+LOW_BUDGET = int(os.getenv("NEWSAPI_LOW_BUDGET", "5"))
+CACHE_TTL = int(os.getenv("NEWSAPI_CACHE_TTL", "900"))
+
+_conn = None
+_db_lock = threading.Lock()
+# One in-flight request per cache key within this process
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "api_calls": 0, "stale_served": 0, "quota_refusals": 0}
+_stats_lock = threading.Lock()
+
+
+class QuotaExhausted(Exception):
+    """Raised when the daily NewsAPI budget is spent and nothing is cached."""
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, used INTEGER NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _today():
+    # NewsAPI quotas reset on UTC days
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _cache_key(params: dict) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _key_lock(key):
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def remaining_quota() -> int:
+    """Requests left in today's shared budget."""
+    with _db_lock:
+        row = _get_conn().execute("SELECT used FROM quota WHERE day = ?", (_today(),)).fetchone()
+    return max(DAILY_QUOTA - (row[0] if row else 0), 0)
+
+
+def _reserve_request() -> bool:
+    """Atomically take one request from today's budget unless it is running low."""
+    with _db_lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO quota (day, used) VALUES (?, 0)", (_today(),))
+            cur = conn.execute(
+                "UPDATE quota SET used = used + 1 WHERE day = ? AND used < ?",
+                (_today(), DAILY_QUOTA - LOW_BUDGET),
+            )
+        return cur.rowcount == 1
+
+
+def _mark_exhausted():
+    """Record that NewsAPI itself reported the quota as used up."""
+    with _db_lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO quota (day, used) VALUES (?, ?)", (_today(), DAILY_QUOTA))
+
+
+def _cached(key):
+    with _db_lock:
+        return _get_conn().execute("SELECT body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+
+def _store(key, body):
+    with _db_lock:
+        conn = _get_conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, fetched_at) VALUES (?, ?, ?)",
+                (key, body, time.time()),
+            )
+            # Responses this old are useless even as a degraded fallback
+            conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - 7 * 86400,))
+
+
+def search(query: str, from_date: str, page_size: int = 6, page: int = 1, **params) -> dict:
+    """
+    Return the decoded /v2/everything response for the query. Raises
+    QuotaExhausted when the budget is low or NewsAPI answers 429 and no cached
+    copy exists, and returns None if the API call otherwise fails.
+    """
+    request = {"q": query, "from": from_date, "pageSize": page_size, "page": page,
+               "sortBy": "publishedAt", "language": "en"}
+    request.update(params)
+    key = _cache_key(request)
+
+    with _key_lock(key):
+        cached = _cached(key)
+        if cached and time.time() - cached[1] < CACHE_TTL:
+            _count("hits")
+            return json.loads(cached[0])
+        _count("misses")
+
+        if not _reserve_request():
+            _count("quota_refusals")
+            if cached:
+                _count("stale_served")
+                return json.loads(cached[0])
+            raise QuotaExhausted(f"NewsAPI budget low ({remaining_quota()} requests left)")
+
+        url = f"{BASE_URL}/v2/everything?" + urlencode(dict(request, apiKey=os.getenv("NEWS_API_KEY", "")))
+        with metrics.span("http_fetch", source="newsapi"):
+            response = fetch(url, use_cache=False)
+        metrics.inc("http_requests_total", source="newsapi", status=response.status_code)
+        _count("api_calls")
+        if response.status_code == 429:
+            _mark_exhausted()
+            if not cached:
+                raise QuotaExhausted("NewsAPI reported the daily quota as used up")
+        if response.status_code != 200:
+            print(f"NewsAPI request failed: {response.status_code}")
+            if cached:
+                _count("stale_served")
+                return json.loads(cached[0])
+            return None
+        _store(key, response.text)
+        return response.json()
+
+
+def stats() -> dict:
+    """Return cache hit rate, API calls made by this process and remaining quota."""
+    with _stats_lock:
+        result = dict(_stats)
+    lookups = result["hits"] + result["misses"]
+    result["hit_rate"] = result["hits"] / lookups if lookups else 0.0
+    result["remaining_quota"] = remaining_quota()
+    return result
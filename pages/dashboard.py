@@ -3,8 +3,10 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta, date
-import os
 from itertools import product
+from sentiment_rollup import read_counts
+import sentiment_scores
+import market_events
 
 # Page config
 st.set_page_config(layout="wide", page_title="Market Strategy Dashboard")
@@ -24,44 +26,27 @@ selected_sources = st.sidebar.multiselect(
     "Select data sources", options=sources, default=sources
 )
 
-# Load and process sentiment data
-@st.cache_data(ttl=60)  # Cache for 1 minute
-def load_sentiment_data():
-    dfs = []
-    
-    # Load NewsAPI data if available
-    newsapi_path = "sentiment_log_newsapi.csv"
-    if os.path.exists(newsapi_path) and os.path.getsize(newsapi_path) > 0:
-        try:
-            df_newsapi = pd.read_csv(newsapi_path, parse_dates=['date'])
-            df_newsapi['source'] = 'NewsAPI'
-            dfs.append(df_newsapi)
-        except Exception as e:
-            st.warning(f"Error reading NewsAPI data: {e}")
-    
-    # Load RSS data if available
-    rss_path = "sentiment_log_rss.csv"
-    if os.path.exists(rss_path) and os.path.getsize(rss_path) > 0:
-        try:
-            df_rss = pd.read_csv(rss_path, parse_dates=['date'])
-            df_rss['source'] = 'RSS'
-            dfs.append(df_rss)
-        except Exception as e:
-            st.warning(f"Error reading RSS data: {e}")
-    
-    # Combine data
-    if not dfs:
-        return pd.DataFrame(columns=['date', 'ticker', 'sentiment', 'source'])
-    
-    df_combined = pd.concat(dfs, ignore_index=True)
-    return df_combined
+# Log source keys -> labels used in this dashboard
+SOURCE_LABELS = {"newsapi": "NewsAPI", "rss": "RSS"}
 
-# Load data
-df = load_sentiment_data()
+# Load pre-aggregated daily sentiment counts
+@st.cache_data(ttl=60)  # Cache for 1 minute
+def load_sentiment_counts(start_date):
+    """
+    Load daily counts per (date, ticker, source, sentiment) from start_date
+    onwards from the rollup table maintained by log_sentiment.
+    """
+    try:
+        df = read_counts(start_date=start_date, sources=list(SOURCE_LABELS))
+    except Exception as e:
+        st.warning(f"Error reading sentiment data: {e}")
+        return pd.DataFrame(columns=['date', 'ticker', 'source', 'sentiment', 'count'])
+    df['source'] = df['source'].map(SOURCE_LABELS)
+    return df
 
-# Filter to last 7 days
+# Load the last 7 days of data
 cutoff_date = pd.Timestamp(date.today() - timedelta(days=7))
-df = df[df['date'] >= cutoff_date]
+df = load_sentiment_counts(cutoff_date.date())
 
 # Get unique tickers
 all_tickers = sorted(df['ticker'].unique().tolist())
@@ -101,7 +86,7 @@ idx = pd.MultiIndex.from_product(
 sentiment_counts = pd.Series(0, index=idx).reset_index(name='count')
 
 # Fill in actual counts
-actual_counts = filtered_df.groupby(['ticker', 'source', 'sentiment']).size().reset_index(name='count')
+actual_counts = filtered_df.groupby(['ticker', 'source', 'sentiment'])['count'].sum().reset_index(name='count')
 
 # Merge to keep all combinations but update with real counts
 sentiment_counts = pd.merge(
@@ -138,7 +123,7 @@ st.plotly_chart(fig, use_container_width=True)
 st.header("Sentiment Summary by Ticker")
 
 # Calculate and display summary metrics by ticker
-ticker_summary = filtered_df.groupby(['ticker', 'sentiment']).size().unstack(fill_value=0)
+ticker_summary = filtered_df.groupby(['ticker', 'sentiment'])['count'].sum().unstack(fill_value=0)
 ticker_summary = ticker_summary.reindex(columns=['bullish', 'neutral', 'bearish'], fill_value=0)
 
 # Ticker metrics with pie charts
@@ -177,12 +162,85 @@ for i, ticker in enumerate(selected_tickers[:5]):  # Limit to 5 tickers in the f
 # Date range info
 st.caption(f"Showing data from {cutoff_date.date()} to {date.today()}")
 
+# Rolling net sentiment scores and swings (all sources together)
+st.header("Sentiment Score and Swings")
+try:
+    scores_df = sentiment_scores.scores(
+        tickers=selected_tickers, start_date=date.today() - timedelta(days=90)
+    )
+except Exception as e:
+    st.warning(f"Error computing sentiment scores: {e}")
+    scores_df = pd.DataFrame(columns=sentiment_scores.COLUMNS)
+
+if scores_df.empty:
+    st.write("No sentiment scores for the selected tickers in the last 90 days.")
+else:
+    fig = px.line(
+        scores_df,
+        x='date',
+        y='ema',
+        color='ticker',
+        title=f"Net Sentiment Score ({sentiment_scores.EMA_SPAN}-day EMA, Last 90 Days)",
+        labels={'ema': 'Net score (bullish - bearish) / total', 'date': 'Date'}
+    )
+    fig.add_hline(y=0, line_dash="dot", line_color="gray")
+    swing_points = scores_df[scores_df['swing'] != 0]
+    if not swing_points.empty:
+        fig.add_trace(go.Scatter(
+            x=swing_points['date'], y=swing_points['ema'], mode='markers', name='Swing',
+            marker=dict(size=10, symbol='diamond',
+                        color=['green' if s > 0 else 'red' for s in swing_points['swing']]),
+            text=swing_points['ticker'],
+        ))
+    st.plotly_chart(fig, use_container_width=True)
+
+    recent_swings = swing_points[swing_points['date'] >= cutoff_date]
+    if recent_swings.empty:
+        st.caption("No sentiment swings in the last 7 days.")
+    else:
+        st.subheader("Swings in the Last 7 Days")
+        st.dataframe(
+            recent_swings[['date', 'ticker', 'total', 'net', 'ema', 'z', 'swing']]
+            .sort_values('date', ascending=False),
+            hide_index=True,
+        )
+
+# Pre- vs post-event sentiment for the selected tickers
+st.header("Event Impact on Sentiment")
+try:
+    impact_df = market_events.impact(tickers=selected_tickers, start_date=date.today() - timedelta(days=365))
+except Exception as e:
+    st.warning(f"Error computing event impact: {e}")
+    impact_df = pd.DataFrame(columns=market_events.IMPACT_COLUMNS)
+
+if impact_df.empty:
+    st.write("No events with sentiment before and after them for the selected tickers in the last year.")
+else:
+    impact_df['label'] = impact_df['date'].dt.strftime('%Y-%m-%d') + " " + impact_df['event']
+    per_event = impact_df.groupby(['label', 'ticker'], as_index=False)['delta'].mean()
+    fig = px.bar(
+        per_event,
+        x='label',
+        y='delta',
+        color='ticker',
+        barmode='group',
+        title=(f"Net Sentiment Change Around Events ({market_events.PRE_DAYS} Days Before "
+               f"vs {market_events.POST_DAYS} Days From the Event)"),
+        labels={'delta': 'Post - pre net score', 'label': 'Event'},
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(
+        impact_df[['date', 'event', 'impact', 'ticker', 'scope', 'pre_net', 'post_net', 'delta',
+                   'pre_articles', 'post_articles', 'complete']].sort_values('date', ascending=False),
+        hide_index=True,
+    )
+
 # Add historical trend
 if st.checkbox("Show Historical Trend", value=False):
     st.subheader("Sentiment Trend Over Time")
     
     # Group by date and sentiment
-    trend_df = filtered_df.groupby(['date', 'sentiment']).size().reset_index(name='count')
+    trend_df = filtered_df.groupby(['date', 'sentiment'])['count'].sum().reset_index(name='count')
     
     # Create line chart
     fig = px.line(
@@ -1,10 +1,12 @@
 import streamlit as st
 from datetime import datetime, date, timedelta
 from news_fetcher import get_rss_general_news
-from summarizer import summarize
-from app import extract_sentiment_keyword
+from article_pipeline import summarize_articles
+from sentiment_utils import extract_sentiment_keyword, is_error_summary
 from sentiment_logger import log_sentiment
-from processed_store import is_processed, mark_processed
+from processed_store import filter_unprocessed, mark_processed
+from ticker_matcher import get_matcher
+import ingest_store
 
 # Page title
 st.title("📰 General Market News")
@@ -26,49 +28,79 @@ def fetch_general_news():
     """
     return get_rss_general_news()
 
-# Fetch general market news (cached)
-articles = fetch_general_news()
-if not articles:
-    st.write("No general market news found.")
-    st.stop()
+if ingest_store.daemon_alive():
+    # The ingestion daemon already summarized and logged the feed; only read its results
+    info_col, btn_col = st.columns([3, 1])
+    info_col.caption(ingest_store.describe_freshness("market", "general"))
+    if btn_col.button("Refresh now"):
+        ingest_store.request_refresh("market", "general")
+        st.info("Refresh requested; reload the page in a moment to see new headlines.")
+    cutoff = (datetime.utcnow() - timedelta(days=7)).isoformat()
+    results = [
+        r for r in ingest_store.recent_articles("market", "general", limit=50)
+        if r["publishedAt"] >= cutoff
+        and (not keyword or keyword.lower() in r["title"].lower())
+    ]
+else:
+    # Fetch general market news (cached)
+    articles = fetch_general_news()
+    if not articles:
+        st.write("No general market news found.")
+        st.stop()
+
+    # Analyze articles automatically
+    results = []
+    cutoff = datetime.utcnow() - timedelta(days=7)
+    # Check the whole batch against the processed store in one lookup
+    new_urls = set(filter_unprocessed([a.get("url") for a in articles if a.get("url")], page_source))
 
-# Analyze articles automatically
-results = []
-cutoff = datetime.utcnow() - timedelta(days=7)
+    # Select the articles to analyze first so they can be summarized in one batch
+    selected = []
+    for article in articles:
+        title = article.get("title", "No title")
+        description = article.get("description") or article.get("content") or ""
+        pub_str = article.get("publishedAt", "")
+        try:
+            pub_date = datetime.fromisoformat(pub_str.replace("Z", ""))
+        except:
+            continue
+        # Only articles from the last 7 days
+        if pub_date < cutoff:
+            continue
+        # Keyword filter
+        if keyword and keyword.lower() not in (title + description).lower():
+            continue
+        selected.append((article, title, description, pub_str, pub_date))
 
-for article in articles:
-    title = article.get("title", "No title")
-    description = article.get("description") or article.get("content") or ""
-    article_source = article.get("source", "Unknown source")
-    pub_str = article.get("publishedAt", "")
-    try:
-        pub_date = datetime.fromisoformat(pub_str.replace("Z", ""))
-    except:
-        continue
-    # Only articles from the last 7 days
-    if pub_date < cutoff:
-        continue
-    # Keyword filter
-    if keyword and keyword.lower() not in (title + description).lower():
-        continue
+    # Reuse summaries of near-duplicate stories, classify locally where confident and
+    # summarize the rest concurrently; results come back in article order
+    summaries = summarize_articles([item[0] for item in selected], "market", page_source)
+    matcher = get_matcher()
 
-    summary = summarize(description, "market")
-    sentiment = extract_sentiment_keyword(summary)
-    # Log sentiment only for new articles
-    url = article.get("url")
-    already = is_processed(url, page_source) if url else False
-    if url and not already:
-        # Log to sentiment_log_rss.csv
-        log_sentiment("market", sentiment, page_source, log_date=pub_date.date())
-        mark_processed(url, page_source, process_date=pub_date.date())
-    # Append to results for display
-    results.append({
-        "title": title,
-        "source": article_source,
-        "publishedAt": pub_str,
-        "summary": summary,
-        "sentiment": sentiment
-    })
+    for (article, title, description, pub_str, pub_date), summary in zip(selected, summaries):
+        article_source = article.get("source", "Unknown source")
+        sentiment = extract_sentiment_keyword(summary)
+        # Watchlist tickers this headline mentions, found in one pass
+        mentioned = sorted(matcher.match(f"{title} {description}"))
+        # Log sentiment only for new articles that are not near-duplicates of a logged story,
+        # and not when summarizing failed, so the next load retries it
+        url = article.get("url")
+        if url and url in new_urls and not is_error_summary(summary):
+            if not article.get("duplicate_of"):
+                # Log to sentiment_log_rss.csv under the market and every mentioned ticker
+                for tagged in ["market"] + mentioned:
+                    log_sentiment(tagged, sentiment, page_source, log_date=pub_date.date())
+            mark_processed(url, page_source, process_date=pub_date.date())
+            new_urls.discard(url)
+        # Append to results for display
+        results.append({
+            "title": title,
+            "source": article_source,
+            "publishedAt": pub_str,
+            "summary": summary,
+            "sentiment": sentiment,
+            "tickers": mentioned
+        })
 
 # Filter by sentiment selection
 filtered = [r for r in results if r["sentiment"] in selected_sentiments]
@@ -80,6 +112,8 @@ else:
     for r in filtered:
         st.markdown(f"### {r['title']}")
         st.caption(f"{r['source']} • {r['publishedAt']}")
+        if r['tickers']:
+            st.caption("Mentions: " + ", ".join(f"${t}" for t in r['tickers']))
         st.success(r['summary'])
         st.markdown(f"*Sentiment:* **{r['sentiment'].title()}**")
         st.markdown("---")
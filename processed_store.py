@@ -1,34 +1,95 @@
 import os
 import csv
+import io
+import threading
 from datetime import date
+import metrics
+import buffered_log
+
+# In-memory index of processed URLs, one entry per source. Each entry holds the
+# set of URLs plus the byte offset of the CSV log we have read up to, so that new
+# rows appended by other sessions or processes are picked up incrementally.
+_index = {}
+_index_lock = threading.Lock()
+
 
 def get_store_file(source: str) -> str:
     """Return the CSV filename for the given source."""
     return f"processed_{source.lower()}.csv"
 
+
+def _sync_index(source: str) -> set:
+    """
+    Bring the in-memory URL set for the source up to date with its CSV log and
+    return it. Only bytes appended since the last sync are read. Must be called
+    with _index_lock held.
+    """
+    file_path = get_store_file(source)
+    entry = _index.setdefault(file_path, {"urls": set(), "offset": 0, "inode": None})
+    # Rows marked here but not flushed yet (taken before reading the file, so a
+    # concurrent flush cannot hide them); kept when the index starts over
+    pending = {row[0] for row in buffered_log.pending(file_path)}
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        # Log missing (e.g. deleted): start over
+        entry.update(urls=pending, offset=0, inode=None)
+        return entry["urls"]
+
+    # Reload from scratch if the file was replaced or truncated
+    if entry["inode"] != st.st_ino or st.st_size < entry["offset"]:
+        entry.update(urls=pending, offset=0, inode=st.st_ino)
+    if st.st_size == entry["offset"]:
+        return entry["urls"]
+
+    with open(file_path, 'rb') as f:
+        f.seek(entry["offset"])
+        chunk = f.read(st.st_size - entry["offset"])
+    # Only consume complete lines; a concurrent writer may be mid-row
+    end = chunk.rfind(b'\n')
+    if end < 0:
+        return entry["urls"]
+    chunk = chunk[:end + 1]
+    for row in csv.reader(io.StringIO(chunk.decode('utf-8', errors='replace'), newline='')):
+        if row and row[0] and row[0] != 'url':
+            entry["urls"].add(row[0])
+    entry["offset"] += len(chunk)
+    return entry["urls"]
+
+
 def is_processed(url: str, source: str) -> bool:
     """Check if the given URL has already been processed for the given source."""
-    file_path = get_store_file(source)
-    if not os.path.isfile(file_path):
-        return False
     try:
-        with open(file_path, newline='') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row and row[0] == url:
-                    return True
+        with _index_lock:
+            return url in _sync_index(source)
     except Exception:
         return False
-    return False
+
+
+def filter_unprocessed(urls, source: str) -> list:
+    """
+    Return the URLs from the given iterable that have not been processed for the
+    source, preserving order. The whole batch is checked against one index sync.
+    """
+    urls = list(urls)
+    try:
+        with metrics.span("processed_lookup", source=source.lower()), _index_lock:
+            seen = _sync_index(source)
+            return [u for u in urls if u not in seen]
+    except Exception:
+        return urls
+
 
 def mark_processed(url: str, source: str, process_date: date = None):
-    """Mark the given URL as processed for the given source, recording the date."""
+    """
+    Mark the given URL as processed for the given source, recording the date.
+    The row is buffered and appended in bulk (see buffered_log); this process
+    sees the URL as processed immediately.
+    """
     if process_date is None:
         process_date = date.today()
     file_path = get_store_file(source)
-    write_header = not os.path.isfile(file_path) or os.path.getsize(file_path) == 0
-    with open(file_path, 'a', newline='') as f:
-        writer = csv.writer(f)
-        if write_header:
-            writer.writerow(['url', 'date'])
-        writer.writerow([url, process_date.isoformat()]) 
\ No newline at end of file
+    with metrics.span("processed_append", source=source.lower()), _index_lock:
+        buffered_log.append(file_path, ['url', 'date'], [url, process_date.isoformat()])
+        # Record locally right away; the offset catches up on the next sync
+        _index.setdefault(file_path, {"urls": set(), "offset": 0, "inode": None})["urls"].add(url)
@@ -0,0 +1,90 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+# Process-wide quote cache shared by every Streamlit session. Prices for the
+# whole watchlist are refreshed together in one batched yfinance download.
+QUOTE_TTL = float(os.getenv("QUOTE_TTL", "60"))
+# After a failed refresh, tickers without a price are not retried for this long
+QUOTE_RETRY_AFTER = float(os.getenv("QUOTE_RETRY_AFTER", "30"))
+
+_quotes = {}  # ticker -> (price, as_of datetime)
+_failed = {}  # ticker -> time.monotonic() of the last refresh that returned no price
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def refresh_quotes(tickers) -> dict:
+    """
+    Download the latest close for all tickers in one batched request and update
+    the cache. Returns the prices that were fetched; tickers left without one
+    are not retried by get_quote() for QUOTE_RETRY_AFTER seconds.
+    """
+    tickers = sorted({t.upper().strip() for t in tickers if t})
+    if not tickers:
+        return {}
+    fetched = _download(tickers)
+    failed_at = time.monotonic()
+    with _lock:
+        for ticker in tickers:
+            if ticker in fetched:
+                _failed.pop(ticker, None)
+            else:
+                _failed[ticker] = failed_at
+    return fetched
+
+
+def _download(tickers) -> dict:
+    import yfinance as yf
+    try:
+        data = yf.download(tickers, period="1d", progress=False, threads=True)
+    except Exception as e:
+        print(f"Quote download failed: {e}")
+        return {}
+    if data is None or data.empty or "Close" not in data:
+        return {}
+
+    close = data["Close"]
+    # A single ticker may come back as a Series rather than one column per ticker
+    columns = {tickers[0]: close} if close.ndim == 1 else {t: close[t] for t in close.columns}
+    now = datetime.now()
+    fetched = {}
+    for ticker, series in columns.items():
+        series = series.dropna()
+        if not series.empty:
+            fetched[str(ticker).upper()] = float(series.iloc[-1])
+    with _lock:
+        for ticker, price in fetched.items():
+            _quotes[ticker] = (price, now)
+    return fetched
+
+
+def get_quote(ticker: str, watchlist=None):
+    """
+    Return (price, as_of) for the ticker from the shared cache. When the cached
+    quote is missing or older than QUOTE_TTL, the whole watchlist is refreshed in
+    one batch. Returns (None, None) if no price is available.
+    """
+    ticker = ticker.upper().strip()
+    with _lock:
+        cached = _quotes.get(ticker)
+        failed_at = _failed.get(ticker)
+    if cached and (datetime.now() - cached[1]).total_seconds() < QUOTE_TTL:
+        return cached
+    # The provider just failed for this ticker; serve what we have until the retry delay passes
+    if failed_at is not None and time.monotonic() - failed_at < QUOTE_RETRY_AFTER:
+        return cached or (None, None)
+
+    # Only one session refreshes at a time; others reuse its result
+    with _refresh_lock:
+        with _lock:
+            cached = _quotes.get(ticker)
+            failed_at = _failed.get(ticker)
+        if cached and (datetime.now() - cached[1]).total_seconds() < QUOTE_TTL:
+            return cached
+        if failed_at is not None and time.monotonic() - failed_at < QUOTE_RETRY_AFTER:
+            return cached or (None, None)
+        refresh_quotes(set(watchlist or []) | {ticker})
+    with _lock:
+        return _quotes.get(ticker, cached or (None, None))
@@ -0,0 +1,111 @@
+"""
+Incremental RSS / Atom parsing for the news feeds.
+
+iter_items() feeds the raw response bytes to an XML pull parser in chunks and
+yields each <item> (RSS) or <entry> (Atom) as soon as it is complete, keeping
+only the fields the pipeline uses (title, link, summary, published) and
+discarding the parsed element right away. select() applies the publish-date
+cutoff, the item limit and the processed-link check on top of it, so that
+parsing stops as soon as enough entries were found or the feed has moved past
+the cutoff; the rest of the document is never parsed.
+
+Feeds that are not well-formed XML (e.g. HTML entities) raise ParseError;
+callers fall back to feedparser for those.
+"""
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+CHUNK_SIZE = 64 * 1024
+# Feeds are newest first, but not strictly; stop after this many old entries in a row
+STALE_RUN = 3
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_date(text):
+    """Parse an RFC 822 (RSS) or ISO 8601 (Atom) date into a naive UTC datetime, or None."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        dt = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        dt = None
+    if dt is None:
+        try:
+            dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _item(elem) -> dict:
+    """The fields used by the pipeline from one <item> or <entry> element."""
+    fields = {}
+    for child in elem:
+        name = _local(child.tag)
+        if name == "link":
+            # Atom links are <link href=...>; prefer the alternate (article) link
+            href = child.get("href")
+            if href is not None:
+                if child.get("rel", "alternate") == "alternate" or "link" not in fields:
+                    fields["link"] = href
+            elif child.text:
+                fields["link"] = child.text.strip()
+        elif name in ("title", "description", "summary", "pubDate", "published", "updated", "date"):
+            fields.setdefault(name, (child.text or "").strip())
+    published = None
+    for name in ("pubDate", "published", "date", "updated"):
+        published = parse_date(fields.get(name))
+        if published is not None:
+            break
+    return {
+        "title": fields.get("title"),
+        "link": fields.get("link"),
+        "summary": fields.get("description") or fields.get("summary") or "",
+        "published": published,
+    }
+
+
+def iter_items(data: bytes, chunk_size: int = CHUNK_SIZE):
+    """Yield the items of an RSS or Atom document in document order, parsing only as far as consumed."""
+    parser = XMLPullParser(events=("end",))
+    for offset in range(0, len(data), chunk_size):
+        parser.feed(data[offset:offset + chunk_size])
+        for _, elem in parser.read_events():
+            if _local(elem.tag) in ("item", "entry"):
+                yield _item(elem)
+                # Free the item; only the empty element stays in the tree
+                elem.clear()
+    parser.close()
+
+
+def select(items, cutoff=None, limit=None, skip=None, stale_run: int = STALE_RUN):
+    """
+    Yield items published at or after cutoff (naive UTC) whose link is not
+    skipped (skip(link) -> True), at most limit of them. Items without a
+    publication date are dropped. Stops after stale_run old items in a row.
+    """
+    if limit is not None and limit <= 0:
+        return
+    found = stale = 0
+    for item in items:
+        if item["published"] is None:
+            continue
+        if cutoff is not None and item["published"] < cutoff:
+            stale += 1
+            if stale >= stale_run:
+                return
+            continue
+        stale = 0
+        if skip is not None and item["link"] and skip(item["link"]):
+            continue
+        found += 1
+        yield item
+        if limit is not None and found >= limit:
+            return
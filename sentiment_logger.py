@@ -1,6 +1,8 @@
-import os
-import csv
 from datetime import date
+import sentiment_store
+import sentiment_rollup
+import metrics
+import buffered_log
 
 def log_sentiment(ticker: str, sentiment: str, source: str, log_date=None, file_path: str = None):
     """
@@ -8,6 +10,10 @@ def log_sentiment(ticker: str, sentiment: str, source: str, log_date=None, file_
     source: identifier used to name the logfile.
     log_date: a datetime.date; defaults to today.
     file_path: optional override of the CSV path.
+    Records in the default per-source logs also update the daily rollups and,
+    once the CSV logs have been migrated, the columnar sentiment store.
+    The CSV row and the store record are buffered and written in bulk
+    (see buffered_log and sentiment_store.append).
     """
     # Determine the date to log
     if log_date is None:
@@ -16,11 +22,15 @@ def log_sentiment(ticker: str, sentiment: str, source: str, log_date=None, file_
     if not isinstance(log_date, date):
         raise ValueError("log_date must be a datetime.date instance")
     # Determine the CSV file path based on source if not provided
-    if file_path is None:
+    default_log = file_path is None
+    use_store = default_log and sentiment_store.is_enabled()
+    if default_log:
         file_path = f"sentiment_log_{source.lower()}.csv"
-    write_header = not os.path.isfile(file_path) or os.path.getsize(file_path) == 0
-    with open(file_path, 'a', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        if write_header:
-            writer.writerow(['date', 'ticker', 'sentiment'])
-        writer.writerow([log_date.isoformat(), ticker, sentiment]) 
\ No newline at end of file
+        # A new rollup database is bootstrapped from the logs before this row is added
+        sentiment_rollup.ensure_ready()
+    with metrics.span("log_append", source=source.lower()):
+        buffered_log.append(file_path, ['date', 'ticker', 'sentiment'], [log_date.isoformat(), ticker, sentiment])
+        if default_log:
+            sentiment_rollup.increment(log_date, ticker, source, sentiment)
+        if use_store:
+            sentiment_store.append({"date": log_date, "ticker": ticker, "sentiment": sentiment, "source": source})
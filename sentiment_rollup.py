@@ -0,0 +1,199 @@
+"""
+Daily sentiment rollups: counts per (date, ticker, source, sentiment).
+
+log_sentiment increments the matching row on every append, so the dashboard and
+trend charts read pre-aggregated counts instead of scanning raw log rows.
+
+    python sentiment_rollup.py rebuild   # regenerate rollups from the raw logs
+    python sentiment_rollup.py check     # compare rollups against the raw logs
+
+The raw logs are the columnar sentiment store once the CSV logs have been
+migrated into it, and the sentiment_log_<source>.csv files until then.
+
+Run rebuild while nothing is logging; check reports any drift afterwards.
+"""
+import os
+import sys
+import csv
+import glob
+import sqlite3
+import threading
+from collections import Counter
+import buffered_log
+import sentiment_store
+
+ROLLUP_PATH = os.getenv("SENTIMENT_ROLLUP_PATH", "sentiment_rollup.db")
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _get_conn():
+    """Open the rollup database once per process, building it from the logs if new."""
+    global _conn
+    if _conn is None:
+        is_new = not os.path.isfile(ROLLUP_PATH)
+        conn = sqlite3.connect(ROLLUP_PATH, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS daily_counts ("
+            " date TEXT, ticker TEXT, source TEXT, sentiment TEXT,"
+            " count INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (date, ticker, source, sentiment))"
+        )
+        # Every change stamps its row with a new version, so readers can pick up
+        # only what changed; a rebuild also starts a new generation
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(daily_counts)")]
+        if "version" not in columns:
+            conn.execute("ALTER TABLE daily_counts ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_daily_counts_version ON daily_counts(version)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0), ('generation', 0)")
+        conn.commit()
+        _conn = conn
+        if is_new:
+            _rebuild(conn)
+    return _conn
+
+
+def _bump(conn, key: str) -> int:
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = ?", (key,))
+    return conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()[0]
+
+
+def ensure_ready():
+    """Open (and if necessary bootstrap) the rollup database before a log append."""
+    with _lock:
+        _get_conn()
+
+
+def increment(log_date, ticker: str, source: str, sentiment: str, count: int = 1):
+    """Add count to the rollup row for the given day, ticker, source and sentiment."""
+    with _lock:
+        conn = _get_conn()
+        with conn:
+            version = _bump(conn, "version")
+            conn.execute(
+                "INSERT INTO daily_counts (date, ticker, source, sentiment, count, version) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (date, ticker, source, sentiment)"
+                " DO UPDATE SET count = count + excluded.count, version = excluded.version",
+                (log_date.isoformat(), ticker, source.lower(), sentiment, count, version),
+            )
+
+
+def version() -> tuple:
+    """(generation, version) of the rollups; version grows with every change, generation with every rebuild."""
+    with _lock:
+        rows = dict(_get_conn().execute("SELECT key, value FROM meta").fetchall())
+    return rows["generation"], rows["version"]
+
+
+def changed_since(since_version: int) -> dict:
+    """Earliest changed date (ISO string) per ticker for rows changed after since_version."""
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT ticker, MIN(date) FROM daily_counts WHERE version > ? GROUP BY ticker", (since_version,)
+        ).fetchall()
+    return dict(rows)
+
+
+def raw_counts() -> Counter:
+    """Count raw log rows per (date, ticker, source, sentiment) from the store or the CSV logs."""
+    if sentiment_store.is_enabled():
+        # read_sentiment flushes the records still buffered in this process first
+        df = sentiment_store.read_sentiment()
+        grouped = df.groupby(["date", "ticker", "source", "sentiment"], observed=True).size()
+        return Counter({
+            (day.strftime("%Y-%m-%d"), str(ticker), str(source), str(sentiment)): int(n)
+            for (day, ticker, source, sentiment), n in grouped.items() if n
+        })
+    # Rows still buffered in this process have already been counted in the rollups
+    buffered_log.flush_all()
+    counts = Counter()
+    for path in sorted(glob.glob("sentiment_log_*.csv")):
+        source = os.path.basename(path)[len("sentiment_log_"):-len(".csv")]
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if row.get("date") and row.get("ticker"):
+                    counts[(row["date"], row["ticker"], source, row.get("sentiment") or "")] += 1
+    return counts
+
+
+def _rebuild(conn) -> int:
+    counts = raw_counts()
+    with conn:
+        _bump(conn, "generation")
+        version = _bump(conn, "version")
+        conn.execute("DELETE FROM daily_counts")
+        conn.executemany(
+            "INSERT INTO daily_counts (date, ticker, source, sentiment, count, version) VALUES (?, ?, ?, ?, ?, ?)",
+            [key + (n, version) for key, n in counts.items()],
+        )
+    return len(counts)
+
+
+def rebuild() -> int:
+    """Regenerate all rollups from the raw logs. Returns the number of rows written."""
+    with _lock:
+        return _rebuild(_get_conn())
+
+
+def check() -> list:
+    """
+    Compare rollups against the raw logs. Returns a list of
+    (key, rollup_count, raw_count) tuples for every mismatch.
+    """
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT date, ticker, source, sentiment, count FROM daily_counts"
+        ).fetchall()
+    rolled = {tuple(r[:4]): r[4] for r in rows if r[4]}
+    raw = raw_counts()
+    return [
+        (key, rolled.get(key, 0), raw.get(key, 0))
+        for key in sorted(set(rolled) | set(raw))
+        if rolled.get(key, 0) != raw.get(key, 0)
+    ]
+
+
+def read_counts(start_date=None, end_date=None, tickers=None, sources=None):
+    """
+    Return rollup rows as a pandas DataFrame with columns date (datetime),
+    ticker, source (lower-case key), sentiment and count.
+    """
+    import pandas as pd
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(start_date.isoformat())
+    if end_date is not None:
+        clauses.append("date <= ?")
+        params.append(end_date.isoformat())
+    for column, values in (("ticker", tickers), ("source", sources)):
+        if values is not None:
+            values = [v.lower() for v in values] if column == "source" else list(values)
+            clauses.append(f"{column} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+    query = "SELECT date, ticker, source, sentiment, count FROM daily_counts WHERE count > 0"
+    if clauses:
+        query += " AND " + " AND ".join(clauses)
+    with _lock:
+        rows = _get_conn().execute(query, params).fetchall()
+    df = pd.DataFrame(rows, columns=["date", "ticker", "source", "sentiment", "count"])
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    return df.dropna(subset=["date"])
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "rebuild":
+        print(f"Rebuilt {rebuild()} rollup rows from raw logs")
+    elif command == "check":
+        mismatches = check()
+        for key, rolled, raw in mismatches:
+            print(f"{key}: rollup={rolled} raw={raw}")
+        print("Rollups consistent with raw logs" if not mismatches else f"{len(mismatches)} mismatches")
+        sys.exit(1 if mismatches else 0)
+    else:
+        print("Usage: python sentiment_rollup.py rebuild | check")
+        sys.exit(1)
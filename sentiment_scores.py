@@ -0,0 +1,246 @@
+"""
+Rolling sentiment scores and swing flags for every ticker.
+
+Daily counts from the rollups (all sources together) become a per-ticker net
+score, (bullish - bearish) / total, laid out as a dense date x ticker matrix.
+From it, for all tickers at once:
+    ema    exponential moving average of the net score (SCORE_EMA_SPAN days)
+    mean   rolling mean of the net score over SCORE_WINDOW days
+    z      z-score of the day's net score against the previous SCORE_Z_WINDOW days
+    swing  +1 / -1 when |z| >= SCORE_Z_THRESHOLD on a day with at least
+           SCORE_MIN_ARTICLES articles, otherwise 0
+Days without articles have no net score: the EMA carries over and the windows
+skip them.
+
+The matrices are cached per process with the rollup version they reflect.
+refresh() asks the rollups which tickers changed since then and recomputes
+only those, from their earliest changed date on. A rollup rebuild, or history
+added before the first cached date, recomputes everything.
+
+    python sentiment_scores.py [--days 7]   # print recent swings
+"""
+import os
+import sys
+import threading
+import sentiment_rollup
+
+EMA_SPAN = int(os.getenv("SCORE_EMA_SPAN", "7"))
+WINDOW = int(os.getenv("SCORE_WINDOW", "7"))
+Z_WINDOW = int(os.getenv("SCORE_Z_WINDOW", "30"))
+Z_THRESHOLD = float(os.getenv("SCORE_Z_THRESHOLD", "2.0"))
+MIN_ARTICLES = int(os.getenv("SCORE_MIN_ARTICLES", "3"))
+# Days with a net score needed in the z-score window
+MIN_HISTORY = int(os.getenv("SCORE_MIN_HISTORY", "5"))
+COLUMNS = ["date", "ticker", "bullish", "bearish", "total", "net", "ema", "mean", "z", "swing"]
+_COUNTS = ("bullish", "bearish", "total")
+_DERIVED = ("net", "ema", "mean", "z", "swing")
+
+_lock = threading.Lock()
+# generation, version, dates (daily DatetimeIndex), tickers, col (ticker -> column)
+# and one days x tickers array per count and derived column
+_cache = None
+
+
+def _load_counts(start_date=None, tickers=None):
+    """Daily bullish, bearish and total counts per (date, ticker), summed over sources."""
+    import pandas as pd
+    df = sentiment_rollup.read_counts(start_date=start_date, tickers=tickers)
+    if df.empty:
+        return pd.DataFrame(columns=["date", "ticker", *_COUNTS])
+    wide = df.pivot_table(index=["date", "ticker"], columns="sentiment", values="count",
+                          aggfunc="sum", fill_value=0)
+    counts = pd.DataFrame({
+        "bullish": wide["bullish"] if "bullish" in wide else 0,
+        "bearish": wide["bearish"] if "bearish" in wide else 0,
+        "total": wide.sum(axis=1),
+    }, index=wide.index)
+    return counts.reset_index()
+
+
+def _empty(generation, version):
+    import numpy as np
+    import pandas as pd
+    cache = {"generation": generation, "version": version,
+             "dates": pd.DatetimeIndex([]), "tickers": [], "col": {}}
+    for name in _COUNTS + _DERIVED:
+        cache[name] = np.zeros((0, 0), dtype=np.int8 if name == "swing" else float)
+    return cache
+
+
+def _resize(cache, end, tickers):
+    """Extend the date axis to end and add columns for new tickers. Returns the old row count."""
+    import numpy as np
+    import pandas as pd
+    old_rows = len(cache["dates"])
+    new_tickers = [t for t in dict.fromkeys(tickers) if t not in cache["col"]]
+    if old_rows and end <= cache["dates"][-1] and not new_tickers:
+        return old_rows
+    start = cache["dates"][0] if old_rows else end
+    dates = pd.date_range(start, max(end, cache["dates"][-1]) if old_rows else end, freq="D")
+    pad_rows, pad_cols = len(dates) - old_rows, len(new_tickers)
+    for name in _COUNTS + _DERIVED:
+        fill = 0 if name in _COUNTS or name == "swing" else np.nan
+        cache[name] = np.pad(cache[name], ((0, pad_rows), (0, pad_cols)), constant_values=fill)
+    for t in new_tickers:
+        cache["col"][t] = len(cache["tickers"])
+        cache["tickers"].append(t)
+    cache["dates"] = dates
+    return old_rows
+
+
+def _fill(cache, counts, r0, cols):
+    """Replace the counts of columns cols from row r0 on with counts (a _load_counts frame)."""
+    import numpy as np
+    for name in _COUNTS:
+        cache[name][r0:, cols] = 0
+    if counts.empty:
+        return
+    rows = ((counts["date"] - cache["dates"][0]).dt.days).to_numpy()
+    cs = counts["ticker"].map(cache["col"]).to_numpy()
+    for name in _COUNTS:
+        cache[name][rows, cs] = counts[name].to_numpy(dtype=float)
+    total = cache["total"][r0:, cols]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cache["net"][r0:, cols] = np.where(
+            total > 0, (cache["bullish"][r0:, cols] - cache["bearish"][r0:, cols]) / total, np.nan)
+
+
+def _window_sums(values, observed, hi, lo):
+    """Sums of values, values squared and observations over rows [lo, hi) via prefix sums."""
+    import numpy as np
+    zero = np.zeros((1, values.shape[1]))
+    s1 = np.vstack([zero, np.cumsum(values, axis=0)])
+    s2 = np.vstack([zero, np.cumsum(values * values, axis=0)])
+    n = np.vstack([zero, np.cumsum(observed, axis=0)])
+    return s1[hi] - s1[lo], s2[hi] - s2[lo], n[hi] - n[lo]
+
+
+def _derive(cache, r0, cols):
+    """Recompute ema, mean, z and swing for columns cols from row r0 on."""
+    import numpy as np
+    if not cols or r0 >= len(cache["dates"]):
+        return
+    net = cache["net"][:, cols]
+    total = cache["total"][r0:, cols]
+
+    # EMA: one step per day, vectorized over tickers, seeded with the previous day
+    alpha = 2.0 / (EMA_SPAN + 1)
+    prev = cache["ema"][r0 - 1, cols] if r0 else np.full(len(cols), np.nan)
+    ema = np.empty_like(net[r0:])
+    for i, row in enumerate(net[r0:]):
+        seen = ~np.isnan(row)
+        prev = np.where(seen & np.isnan(prev), row, np.where(seen, prev + alpha * (row - prev), prev))
+        ema[i] = prev
+    cache["ema"][r0:, cols] = ema
+
+    # Windows only need the rows they reach back to
+    lo = max(0, r0 - max(WINDOW, Z_WINDOW))
+    seg = net[lo:]
+    observed = ~np.isnan(seg)
+    values = np.where(observed, seg, 0.0)
+    idx = np.arange(r0 - lo, len(seg))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Rolling mean over the window ending today
+        s1, _, n = _window_sums(values, observed, idx + 1, np.maximum(idx + 1 - WINDOW, 0))
+        cache["mean"][r0:, cols] = np.where(n > 0, s1 / n, np.nan)
+        # Today against the window before it
+        s1, s2, n = _window_sums(values, observed, idx, np.maximum(idx - Z_WINDOW, 0))
+        mu = s1 / n
+        std = np.sqrt(np.maximum(s2 / n - mu * mu, 0.0))
+        ok = (n >= MIN_HISTORY) & (std > 1e-9) & observed[idx]
+        z = np.where(ok, (seg[idx] - mu) / std, np.nan)
+    cache["z"][r0:, cols] = z
+    flagged = (np.abs(np.nan_to_num(z)) >= Z_THRESHOLD) & (total >= MIN_ARTICLES)
+    cache["swing"][r0:, cols] = np.where(flagged, np.sign(np.nan_to_num(z)), 0).astype(np.int8)
+
+
+def _build(generation, version):
+    """Compute every ticker from the full rollup history."""
+    cache = _empty(generation, version)
+    counts = _load_counts()
+    if counts.empty:
+        return cache
+    _resize(cache, counts["date"].min(), [])
+    _resize(cache, counts["date"].max(), sorted(counts["ticker"].unique()))
+    cols = list(range(len(cache["tickers"])))
+    _fill(cache, counts, 0, cols)
+    _derive(cache, 0, cols)
+    return cache
+
+
+def refresh() -> int:
+    """Bring the cached scores up to date with the rollups. Returns how many tickers were recomputed."""
+    import pandas as pd
+    global _cache
+    generation, version = sentiment_rollup.version()
+    with _lock:
+        if _cache is None or _cache["generation"] != generation:
+            _cache = _build(generation, version)
+            return len(_cache["tickers"])
+        if version == _cache["version"]:
+            return 0
+        changed = {t: pd.Timestamp(d) for t, d in sentiment_rollup.changed_since(_cache["version"]).items()}
+        first = min(changed.values()) if changed else None
+        if first is not None and (not len(_cache["dates"]) or first < _cache["dates"][0]):
+            _cache = _build(generation, version)
+            return len(_cache["tickers"])
+        if changed:
+            counts = _load_counts(start_date=first.date(), tickers=list(changed))
+            end = counts["date"].max() if not counts.empty else first
+            old_rows = _resize(_cache, end, sorted(changed))
+            r0 = (first - _cache["dates"][0]).days
+            cols = [_cache["col"][t] for t in changed]
+            _fill(_cache, counts, r0, cols)
+            _derive(_cache, r0, cols)
+            # Days added at the end also move the windows of the other tickers
+            others = [c for c in range(len(_cache["tickers"])) if c not in set(cols)]
+            _derive(_cache, old_rows, others)
+        _cache["version"] = version
+        return len(changed)
+
+
+def scores(tickers=None, start_date=None, observed_only: bool = False):
+    """
+    Return scores as a pandas DataFrame with COLUMNS, one row per ticker and
+    day from its first article on (only days with articles if observed_only).
+    """
+    import numpy as np
+    import pandas as pd
+    refresh()
+    with _lock:
+        cache = _cache
+        cols = [cache["col"][t] for t in (tickers if tickers is not None else cache["tickers"]) if t in cache["col"]]
+        r0 = 0
+        if start_date is not None and len(cache["dates"]):
+            r0 = max(0, (pd.Timestamp(start_date) - cache["dates"][0]).days)
+        dates = cache["dates"][r0:]
+        data = {name: cache[name][r0:, cols] for name in _COUNTS + _DERIVED}
+        names = [cache["tickers"][c] for c in cols]
+    df = pd.DataFrame({
+        "date": np.repeat(dates.to_numpy(), len(cols)),
+        "ticker": np.tile(np.array(names, dtype=object), len(dates)),
+        **{name: values.ravel() for name, values in data.items()},
+    })
+    df[list(_COUNTS)] = df[list(_COUNTS)].astype(int)
+    keep = df["total"] > 0 if observed_only else df["ema"].notna()
+    return df.loc[keep, COLUMNS].reset_index(drop=True)
+
+
+def swings(since_date=None, tickers=None):
+    """Days flagged as a sentiment swing, from since_date (default: the latest day) on."""
+    import pandas as pd
+    refresh()
+    if since_date is None:
+        with _lock:
+            if not len(_cache["dates"]):
+                return pd.DataFrame(columns=COLUMNS)
+            since_date = _cache["dates"][-1]
+    df = scores(tickers=tickers, start_date=since_date, observed_only=True)
+    return df[df["swing"] != 0].sort_values(["date", "ticker"]).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from datetime import date, timedelta
+    days = int(sys.argv[sys.argv.index("--days") + 1]) if "--days" in sys.argv else 7
+    found = swings(since_date=date.today() - timedelta(days=days))
+    print(found.to_string(index=False) if not found.empty else f"No sentiment swings in the last {days} days")
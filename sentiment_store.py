@@ -0,0 +1,338 @@
+"""
+Columnar, date-partitioned storage for sentiment records.
+
+Records are written as Parquet files under sentiment_store/date=YYYY-MM-DD/ with
+dictionary-encoded ticker, sentiment and source columns. Readers push date,
+ticker and source filters down to pyarrow so only the matching partitions and
+columns are loaded.
+
+The store is used once the existing CSV logs have been migrated into it:
+    python sentiment_store.py migrate
+    python sentiment_store.py compact
+Until then (or if pyarrow is not installed) readers fall back to the
+sentiment_log_<source>.csv files.
+
+append() buffers records and writes them as one part file per partition once
+STORE_FLUSH_ROWS are pending or the oldest has waited STORE_FLUSH_INTERVAL
+seconds, and at exit. Compaction swaps the merged file in for its parts while
+holding an exclusive flock on the store's lock file; readers hold it shared,
+so they see either the parts or the compacted file, never both.
+"""
+import os
+import sys
+import glob
+import time
+import uuid
+import atexit
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+import buffered_log
+
+try:
+    import fcntl
+except ImportError:  # no cross-process locking on this platform
+    fcntl = None
+
+# pyarrow is optional and slow to import, so it is loaded on first use
+pa = ds = pq = None
+_pyarrow_checked = False
+
+STORE_DIR = os.getenv("SENTIMENT_STORE_DIR", "sentiment_store")
+# Marker written by the migrator; the store is authoritative only once it exists
+MARKER_FILE = "_MIGRATED"
+# Partitions with more part files than this are compacted after a write
+COMPACT_THRESHOLD = 32
+COLUMNS = ["date", "ticker", "sentiment", "source"]
+FLUSH_ROWS = int(os.getenv("STORE_FLUSH_ROWS", "500"))
+FLUSH_INTERVAL = float(os.getenv("STORE_FLUSH_INTERVAL", "30"))
+# Shared by readers, exclusive while compaction swaps files
+LOCK_FILE = ".store.lock"
+
+_buffer = []
+_buffer_since = 0.0
+_buffer_lock = threading.Lock()
+_flusher = None
+
+
+def _load_pyarrow() -> bool:
+    """Import pyarrow once; returns False if it is not installed."""
+    global pa, ds, pq, _pyarrow_checked
+    if not _pyarrow_checked:
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+        except ImportError:  # optional dependency
+            pa = None
+        _pyarrow_checked = True
+    return pa is not None
+
+
+def is_enabled() -> bool:
+    """Return True if pyarrow is available and the CSV logs have been migrated."""
+    return os.path.isfile(os.path.join(STORE_DIR, MARKER_FILE)) and _load_pyarrow()
+
+
+def _schema():
+    return pa.schema([
+        ("ticker", pa.dictionary(pa.int32(), pa.string())),
+        ("sentiment", pa.dictionary(pa.int8(), pa.string())),
+        ("source", pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive")
+
+
+def _partition_dir(day: date) -> str:
+    return os.path.join(STORE_DIR, f"date={day.isoformat()}")
+
+
+@contextmanager
+def _store_lock(exclusive: bool):
+    """Hold the store-wide flock, shared for readers and exclusive for compaction."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(STORE_DIR, exist_ok=True)
+    fd = os.open(os.path.join(STORE_DIR, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(fd)  # also releases the lock
+
+
+def append(record):
+    """Buffer one record (dict with date, ticker, sentiment, source) for a batched write."""
+    global _buffer_since
+    with _buffer_lock:
+        if not _buffer:
+            _buffer_since = time.monotonic()
+        _buffer.append(record)
+        full = len(_buffer) >= FLUSH_ROWS
+        _start_flusher()
+    if full:
+        flush()
+
+
+def flush() -> int:
+    """Write all buffered records; returns how many were written."""
+    global _buffer
+    with _buffer_lock:
+        records, _buffer = _buffer, []
+        if not records:
+            return 0
+        try:
+            write_records(records)
+        except Exception:
+            # Keep the records for the next attempt, in order
+            _buffer = records + _buffer
+            raise
+    return len(records)
+
+
+def _flush_quietly():
+    try:
+        flush()
+    except Exception as e:
+        print(f"Could not flush the sentiment store: {e}")
+
+
+def _run_flusher():
+    while True:
+        time.sleep(FLUSH_INTERVAL / 2)
+        with _buffer_lock:
+            due = bool(_buffer) and time.monotonic() - _buffer_since >= FLUSH_INTERVAL
+        if due:
+            _flush_quietly()
+
+
+def _start_flusher():
+    """Start the background flusher once per process. Must be called with _buffer_lock held."""
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = threading.Thread(target=_run_flusher, name="store-flusher", daemon=True)
+        _flusher.start()
+
+
+atexit.register(_flush_quietly)
+
+
+def write_records(records):
+    """
+    Append records (dicts with date, ticker, sentiment, source) to the store,
+    writing one part file per date partition. Use append() for single records.
+    """
+    by_day = {}
+    for rec in records:
+        day = rec["date"]
+        if isinstance(day, datetime):
+            day = day.date()
+        by_day.setdefault(day, []).append(rec)
+    for day, rows in by_day.items():
+        table = pa.table({
+            "ticker": pa.array([r["ticker"] for r in rows]).dictionary_encode(),
+            "sentiment": pa.array([r["sentiment"] for r in rows]).dictionary_encode(),
+            "source": pa.array([r["source"].lower() for r in rows]).dictionary_encode(),
+        }).cast(_schema())
+        part_dir = _partition_dir(day)
+        os.makedirs(part_dir, exist_ok=True)
+        name = f"part-{int(time.time() * 1000)}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = os.path.join(part_dir, "." + name)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(part_dir, name))
+        if len(glob.glob(os.path.join(part_dir, "part-*.parquet"))) > COMPACT_THRESHOLD:
+            compact_partition(part_dir)
+
+
+def compact_partition(part_dir: str):
+    """Merge all part files of one partition into a single file."""
+    lock_path = os.path.join(part_dir, ".compact.lock")
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        # Another writer is compacting; reclaim the lock only if it is stale
+        try:
+            if time.time() - os.path.getmtime(lock_path) < 60:
+                return
+            os.remove(lock_path)
+        except FileNotFoundError:
+            return  # that compaction just finished
+        return compact_partition(part_dir)
+    try:
+        parts = sorted(glob.glob(os.path.join(part_dir, "part-*.parquet")))
+        if len(parts) <= 1:
+            return
+        table = pa.concat_tables([pq.read_table(p, schema=_schema()) for p in parts])
+        name = f"part-{int(time.time() * 1000)}-{os.getpid()}-compacted.parquet"
+        tmp_path = os.path.join(part_dir, "." + name)
+        pq.write_table(table, tmp_path)
+        # Publish the merged file and drop its parts in one step for readers
+        with _store_lock(exclusive=True):
+            os.replace(tmp_path, os.path.join(part_dir, name))
+            for p in parts:
+                os.remove(p)
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def compact():
+    """Compact every partition in the store."""
+    if not _load_pyarrow():
+        raise RuntimeError("pyarrow is required for the columnar sentiment store")
+    for part_dir in sorted(glob.glob(os.path.join(STORE_DIR, "date=*"))):
+        compact_partition(part_dir)
+
+
+def _read_store(start_date, end_date, tickers, sources, columns):
+    import pandas as pd
+    expr = None
+
+    def _and(e, new):
+        return new if e is None else e & new
+
+    if start_date is not None:
+        expr = _and(expr, ds.field("date") >= pa.scalar(start_date, pa.date32()))
+    if end_date is not None:
+        expr = _and(expr, ds.field("date") <= pa.scalar(end_date, pa.date32()))
+    if tickers is not None:
+        expr = _and(expr, ds.field("ticker").isin(list(tickers)))
+    if sources is not None:
+        expr = _and(expr, ds.field("source").isin([s.lower() for s in sources]))
+    with _store_lock(exclusive=False):
+        dataset = ds.dataset(STORE_DIR, format="parquet", partitioning=_partitioning(),
+                             schema=_schema().append(pa.field("date", pa.date32())),
+                             exclude_invalid_files=True)
+        table = dataset.to_table(columns=columns, filter=expr)
+    df = table.to_pandas()
+    if "date" in df:
+        df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def _read_csv_logs(start_date, end_date, tickers, sources, columns):
+    """Fallback reader over the sentiment_log_<source>.csv files."""
+    import pandas as pd
+    buffered_log.flush_all()
+    frames = []
+    for path in sorted(glob.glob("sentiment_log_*.csv")):
+        source = os.path.basename(path)[len("sentiment_log_"):-len(".csv")]
+        if sources is not None and source not in [s.lower() for s in sources]:
+            continue
+        if os.path.getsize(path) == 0:
+            continue
+        df = pd.read_csv(path)
+        df["source"] = source
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(frames, ignore_index=True)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df = df.dropna(subset=["date"])
+    if start_date is not None:
+        df = df[df["date"] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df["date"] <= pd.Timestamp(end_date)]
+    if tickers is not None:
+        df = df[df["ticker"].isin(list(tickers))]
+    for col in ("ticker", "sentiment", "source"):
+        df[col] = df[col].astype("category")
+    return df[columns].reset_index(drop=True)
+
+
+def read_sentiment(start_date=None, end_date=None, tickers=None, sources=None, columns=None):
+    """
+    Return sentiment records as a pandas DataFrame with columns date, ticker,
+    sentiment and source (lower-case source key). Date range, ticker and
+    source filters are pushed down to the columnar store when it is enabled.
+    """
+    columns = columns or COLUMNS
+    if is_enabled():
+        # Records buffered in this process are part of the history too
+        flush()
+        return _read_store(start_date, end_date, tickers, sources, columns)
+    return _read_csv_logs(start_date, end_date, tickers, sources, columns)
+
+
+def migrate_csv(force: bool = False) -> int:
+    """
+    One-shot migration of the sentiment_log_<source>.csv files into the store.
+    Returns the number of records migrated.
+    """
+    if not _load_pyarrow():
+        raise RuntimeError("pyarrow is required for the columnar sentiment store")
+    if os.path.isdir(STORE_DIR):
+        if not force:
+            raise RuntimeError(f"{STORE_DIR} already exists; pass --force to rebuild it")
+        shutil.rmtree(STORE_DIR)
+    df = _read_csv_logs(None, None, None, None, COLUMNS)
+    records = [
+        {"date": d.date(), "ticker": t, "sentiment": s, "source": src}
+        for d, t, s, src in zip(df["date"], df["ticker"].astype(str),
+                                df["sentiment"].astype(str), df["source"].astype(str))
+    ]
+    os.makedirs(STORE_DIR, exist_ok=True)
+    if records:
+        write_records(records)
+    compact()
+    with open(os.path.join(STORE_DIR, MARKER_FILE), "w") as f:
+        f.write(datetime.now().isoformat())
+    return len(records)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        count = migrate_csv(force="--force" in sys.argv)
+        print(f"Migrated {count} sentiment records into {STORE_DIR}")
+    elif command == "compact":
+        compact()
+        print(f"Compacted {STORE_DIR}")
+    else:
+        print("Usage: python sentiment_store.py migrate [--force] | compact")
+        sys.exit(1)
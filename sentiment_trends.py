@@ -1,22 +1,40 @@
-import pandas as pd
-import plotly.express as px
-from pandas.errors import EmptyDataError
+from sentiment_rollup import read_counts
+import buffered_log
 
 
-def plot_sentiment_trend(log_path: str = "sentiment_log.csv", ticker: str = "OKLO"):
+def plot_sentiment_trend(log_path: str = "sentiment_log.csv", ticker: str = "OKLO", source: str = None):
     """
     Read the sentiment log CSV, filter by ticker, and plot an interactive stacked bar chart
     of sentiment counts per day using Plotly Express.
+    If source is given, pre-aggregated daily counts are read from the rollup table instead,
+    limited to the ticker and the last 7 days.
     """
+    # pandas and plotly are imported on first use to keep app start-up fast
+    import pandas as pd
+    import plotly.express as px
+    from pandas.errors import EmptyDataError
+
     # Load data, handle missing or empty files
-    try:
-        df = pd.read_csv(log_path, parse_dates=["date"])
-    except FileNotFoundError:
-        print(f"Log file not found: {log_path}")
-        return None
-    except EmptyDataError:
-        print(f"No data to parse from log file: {log_path}")
-        return None
+    if source is not None:
+        start = (pd.Timestamp.now() - pd.Timedelta(days=7)).date()
+        try:
+            df = read_counts(start_date=start, tickers=[ticker], sources=[source])
+        except Exception as e:
+            print(f"Error reading sentiment rollups for {source}: {e}")
+            return None
+    else:
+        # Write this process's buffered rows first so the chart includes them
+        buffered_log.flush_all()
+        try:
+            df = pd.read_csv(log_path, parse_dates=["date"])
+        except FileNotFoundError:
+            print(f"Log file not found: {log_path}")
+            return None
+        except EmptyDataError:
+            print(f"No data to parse from log file: {log_path}")
+            return None
+        # Each raw log row counts once
+        df['count'] = 1
 
     # Coerce 'date' column to datetime and drop invalid entries
     df['date'] = pd.to_datetime(df['date'], errors='coerce')
@@ -44,8 +62,8 @@ def plot_sentiment_trend(log_path: str = "sentiment_log.csv", ticker: str = "OKL
         print(f"No recent sentiment data (last 7 days) available for ticker: {ticker}")
         return None
 
-    # Group by date and sentiment, count occurrences
-    grouped = df.groupby(["date", "sentiment"]).size().reset_index(name="count")
+    # Group by date and sentiment, summing counts
+    grouped = df.groupby(["date", "sentiment"])["count"].sum().reset_index(name="count")
 
     # Define order and colors for consistency
     sentiment_order = ["bullish", "neutral", "bearish", "unknown"]
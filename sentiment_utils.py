@@ -0,0 +1,22 @@
+"""
+Small text helpers shared by the app, its pages and the batch jobs.
+
+Kept free of heavy imports so that importing them does not pull in the
+Streamlit app or any SDK.
+"""
+
+
+def extract_sentiment_keyword(text: str) -> str:
+    """
+    Extract the primary sentiment keyword from the summary text.
+    """
+    lower = text.lower()
+    for kw in ('bullish', 'bearish', 'neutral'):
+        if kw in lower:
+            return kw
+    return 'unknown'
+
+
+def is_error_summary(text: str) -> bool:
+    """True for the placeholder summarize() returns when the LLM call failed."""
+    return (text or "").startswith("Error summarizing")
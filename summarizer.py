@@ -1,30 +1,254 @@
 import os
-import openai
-from openai import OpenAI
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def summarize(text, ticker):
-    prompt = (
-        f"You are analyzing a stock market news summary for the ticker {ticker}.\n"
-        "Your task is to classify the overall sentiment as one of the following:\n"
-        "- Bullish (if the article suggests a positive outlook or upside)\n"
-        "- Bearish (if it suggests risks, decline, or negative outcomes)\n"
-        "- Neutral (if no clear direction is implied or it's too speculative)\n\n"
-        "Avoid inferring sentiment unless there is clear evidence.\n"
-        "If the article is too vague or mixed, choose Neutral.\n\n"
-        "Respond in this exact format:\n"
-        "Sentiment: <Bullish | Bearish | Neutral>\n"
-        "Suggested Action: <a short recommendation to investors>\n\n"
-        f"News Summary:\n{text}"
-    )
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+import summary_cache
+import metrics
+
+_client = None
+_client_lock = threading.Lock()
+
+MODEL = "gpt-4"
+# Concurrency limits for summarize_all
+MAX_IN_FLIGHT = int(os.getenv("SUMMARY_MAX_WORKERS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("SUMMARY_TIMEOUT", "30"))
+# Approximate prompt token budget per summarize_many request
+BATCH_TOKEN_BUDGET = int(os.getenv("SUMMARY_BATCH_TOKENS", "3000"))
+
+PROMPT_TEMPLATE = (
+    "You are analyzing a stock market news summary for the ticker {ticker}.\n"
+    "Your task is to classify the overall sentiment as one of the following:\n"
+    "- Bullish (if the article suggests a positive outlook or upside)\n"
+    "- Bearish (if it suggests risks, decline, or negative outcomes)\n"
+    "- Neutral (if no clear direction is implied or it's too speculative)\n\n"
+    "Avoid inferring sentiment unless there is clear evidence.\n"
+    "If the article is too vague or mixed, choose Neutral.\n\n"
+    "Respond in this exact format:\n"
+    "Sentiment: <Bullish | Bearish | Neutral>\n"
+    "Suggested Action: <a short recommendation to investors>\n\n"
+    "News Summary:\n{text}"
+)
+
+BATCH_PROMPT_TEMPLATE = (
+    "You are analyzing several stock market news summaries for the ticker {ticker}.\n"
+    "For each numbered article, classify the overall sentiment as one of the following:\n"
+    "- Bullish (if the article suggests a positive outlook or upside)\n"
+    "- Bearish (if it suggests risks, decline, or negative outcomes)\n"
+    "- Neutral (if no clear direction is implied or it's too speculative)\n\n"
+    "Avoid inferring sentiment unless there is clear evidence.\n"
+    "If an article is too vague or mixed, choose Neutral.\n\n"
+    "Respond with only a JSON object keyed by article number, in this exact shape:\n"
+    '{{"0": {{"sentiment": "Bullish | Bearish | Neutral", "action": "<a short recommendation to investors>"}}}}\n\n'
+    "News Summaries:\n{articles}"
+)
+
+def get_client():
+    """The shared OpenAI client, created on first use (the SDK is slow to import)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+def _cache_keys(ticker, text):
+    """Cache keys of the single-article and batch prompts, in that order."""
+    return [summary_cache.make_key(MODEL, template, ticker, text)
+            for template in (PROMPT_TEMPLATE, BATCH_PROMPT_TEMPLATE)]
+
+def summarize(text, ticker, timeout=None):
+    # Serve repeated articles from the persistent summary cache, whichever path stored them
+    cached = summary_cache.get_any(_cache_keys(ticker, text))
+    if cached is not None:
+        return cached
+    return _summarize_uncached(text, ticker, timeout)
+
+def _summarize_uncached(text, ticker, timeout=None):
+    """One single-article LLM request; the result is cached under the single-article key."""
+    key = summary_cache.make_key(MODEL, PROMPT_TEMPLATE, ticker, text)
+    prompt = PROMPT_TEMPLATE.format(ticker=ticker, text=text)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5
-        )
-        return response.choices[0].message.content
+        with metrics.span("llm_call", mode="single"):
+            client = get_client()
+            api = client.with_options(timeout=timeout) if timeout else client
+            response = api.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.5
+            )
+        _record_usage(response, "single")
+        summary = response.choices[0].message.content
     except Exception as e:
+        metrics.inc("llm_calls_total", mode="single", outcome="error")
+        # Errors are not cached so the next view retries
         return f"Error summarizing: {e}"
+    summary_cache.put(key, summary, model=MODEL, ticker=ticker, text=text)
+    return summary
+
+def _record_usage(response, mode):
+    """Count a successful LLM call and its prompt / completion tokens."""
+    metrics.inc("llm_calls_total", mode=mode, outcome="ok")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.inc("llm_tokens_total", usage.prompt_tokens or 0, direction="prompt")
+        metrics.inc("llm_tokens_total", usage.completion_tokens or 0, direction="completion")
+
+def _run_concurrently(fn, arg_list, max_workers, timeout, timed_out):
+    """
+    Call fn(*args) for each entry of arg_list on a bounded thread pool and return
+    the results in input order. Calls that have not finished within the time
+    allowed for their wave of requests yield timed_out instead.
+    """
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(arg_list)))
+    try:
+        futures = [pool.submit(fn, *args) for args in arg_list]
+        # Allow one timeout per wave of requests plus some slack for queueing
+        waves = -(-len(arg_list) // max_workers)
+        wait(futures, timeout=timeout * waves + 5)
+        results = []
+        for fut in futures:
+            if fut.done():
+                results.append(fut.result())
+            else:
+                fut.cancel()
+                results.append(timed_out)
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def summarize_all(texts, ticker, max_workers=None, timeout=None):
+    """
+    Summarize several article texts concurrently and return the summaries in the
+    same order as the input. At most max_workers requests are in flight at once;
+    each request is bounded by timeout seconds.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    max_workers = max_workers or MAX_IN_FLIGHT
+    timeout = timeout or REQUEST_TIMEOUT
+    if len(texts) == 1 or max_workers <= 1:
+        return [summarize(t, ticker, timeout=timeout) for t in texts]
+    return _run_concurrently(
+        summarize, [(t, ticker, timeout) for t in texts],
+        max_workers, timeout, "Error summarizing: request timed out"
+    )
+
+def _estimate_tokens(text):
+    """Rough token count (about four characters per token)."""
+    return len(text or "") // 4 + 1
+
+def _pack_by_budget(indices, texts, budget):
+    """Split article indices into packs whose estimated prompt size fits the budget."""
+    overhead = _estimate_tokens(BATCH_PROMPT_TEMPLATE)
+    packs, current, used = [], [], overhead
+    for i in indices:
+        cost = _estimate_tokens(texts[i]) + 40  # per-article numbering and output
+        if current and used + cost > budget:
+            packs.append(current)
+            current, used = [], overhead
+        current.append(i)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+def _parse_batch_output(content, count):
+    """
+    Parse the JSON answer of a batch request into a list of summaries in the
+    single-article format, with None for entries that are missing or malformed.
+    """
+    results = [None] * count
+    match = re.search(r"\{.*\}", content or "", re.DOTALL)
+    if not match:
+        return results
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return results
+    if not isinstance(data, dict):
+        return results
+    for pos in range(count):
+        entry = data.get(str(pos))
+        if not isinstance(entry, dict):
+            continue
+        sentiment = str(entry.get("sentiment", "")).strip().title()
+        if sentiment not in ("Bullish", "Bearish", "Neutral"):
+            continue
+        action = str(entry.get("action", "")).strip()
+        results[pos] = f"Sentiment: {sentiment}\nSuggested Action: {action}"
+    return results
+
+def _summarize_pack(texts, ticker, timeout):
+    """Send one batch request for the given texts; None marks items that failed to parse."""
+    articles = "\n\n".join(f"[{pos}] {text}" for pos, text in enumerate(texts))
+    prompt = BATCH_PROMPT_TEMPLATE.format(ticker=ticker, articles=articles)
+    try:
+        with metrics.span("llm_call", mode="batch"):
+            client = get_client()
+            api = client.with_options(timeout=timeout) if timeout else client
+            response = api.chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.5
+            )
+        _record_usage(response, "batch")
+        content = response.choices[0].message.content
+    except Exception as e:
+        metrics.inc("llm_calls_total", mode="batch", outcome="error")
+        print(f"Batch summarize failed, falling back to per-article calls: {e}")
+        return [None] * len(texts)
+    return _parse_batch_output(content, len(texts))
+
+def summarize_many(items, ticker, token_budget=None, max_workers=None, timeout=None):
+    """
+    Summarize many article texts using as few requests as possible. Uncached
+    texts are packed into structured multi-article prompts split by a token
+    budget, and any item whose output fails to parse falls back to summarize().
+    Returns one summary per item, in order, in the same format as summarize().
+    """
+    texts = list(items)
+    token_budget = token_budget or BATCH_TOKEN_BUDGET
+    max_workers = max_workers or MAX_IN_FLIGHT
+    timeout = timeout or REQUEST_TIMEOUT
+    results = [None] * len(texts)
+    keys = [summary_cache.make_key(MODEL, BATCH_PROMPT_TEMPLATE, ticker, t) for t in texts]
+
+    pending = []
+    for i, text in enumerate(texts):
+        # A summary from either path is reusable (one lookup, counted once)
+        cached = summary_cache.get_any(_cache_keys(ticker, text)[::-1])
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    packs = _pack_by_budget(pending, texts, token_budget)
+    outputs = _run_concurrently(
+        _summarize_pack, [([texts[i] for i in pack], ticker, timeout) for pack in packs],
+        max_workers, timeout, None
+    )
+    fallback = []
+    for pack, output in zip(packs, outputs):
+        output = output or [None] * len(pack)
+        for i, summary in zip(pack, output):
+            if summary is None:
+                fallback.append(i)
+                continue
+            results[i] = summary
+            summary_cache.put(keys[i], summary, model=MODEL, ticker=ticker, text=texts[i])
+
+    # Items the batch could not answer go through the single-article path;
+    # their cache lookup above already counted, so it is not repeated
+    if fallback:
+        singles = _run_concurrently(
+            _summarize_uncached, [(texts[i], ticker, timeout) for i in fallback],
+            max_workers, timeout, "Error summarizing: request timed out"
+        )
+        for i, summary in zip(fallback, singles):
+            results[i] = summary
+    return results
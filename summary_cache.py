@@ -0,0 +1,122 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Persistent cache of LLM summaries keyed by a hash of everything that shapes the
+# answer: model, prompt template, ticker and article text. Backed by SQLite so the
+# cache survives restarts and is shared by every Streamlit session and worker.
+CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.db")
+MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+MAX_AGE_SECONDS = float(os.getenv("SUMMARY_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def _get_conn():
+    """Open the cache database once per process and create the table if needed."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, timeout=30, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT, ticker TEXT, text TEXT, summary TEXT,"
+            " created_at REAL, accessed_at REAL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_accessed ON summaries(accessed_at)")
+        _conn.commit()
+    return _conn
+
+
+def make_key(model: str, template: str, ticker: str, text: str) -> str:
+    """Return the content hash used as the cache key."""
+    h = hashlib.sha256()
+    for part in (model, template, ticker, text):
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def get(key: str):
+    """Return the cached summary for the key, or None on a miss or expired entry."""
+    return get_any([key])
+
+
+def get_any(keys):
+    """
+    Return the cached summary for the first of keys that has one, or None.
+    Counts as a single hit or miss however many keys are tried.
+    """
+    keys = list(keys)
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        rows = dict(conn.execute(
+            f"SELECT key, summary FROM summaries WHERE key IN ({', '.join('?' * len(keys))})"
+            " AND created_at >= ?",
+            (*keys, now - MAX_AGE_SECONDS),
+        ).fetchall())
+        key = next((k for k in keys if k in rows), None)
+        if key is None:
+            _stats["misses"] += 1
+            return None
+        conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+        conn.commit()
+        _stats["hits"] += 1
+        return rows[key]
+
+
+def put(key: str, summary: str, model: str = "", ticker: str = "", text: str = ""):
+    """Store a summary and evict expired and least recently used entries."""
+    now = time.time()
+    with _lock:
+        conn = _get_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO summaries (key, model, ticker, text, summary, created_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, model, ticker, text, summary, now, now),
+        )
+        _stats["writes"] += 1
+        _evict(conn, now)
+        conn.commit()
+
+
+def _evict(conn, now: float):
+    """Drop entries older than the max age, then trim to MAX_ENTRIES by LRU."""
+    cur = conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - MAX_AGE_SECONDS,))
+    evicted = cur.rowcount
+    (count,) = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()
+    if count > MAX_ENTRIES:
+        cur = conn.execute(
+            "DELETE FROM summaries WHERE key IN ("
+            " SELECT key FROM summaries ORDER BY accessed_at ASC LIMIT ?)",
+            (count - MAX_ENTRIES,),
+        )
+        evicted += cur.rowcount
+    _stats["evictions"] += max(evicted, 0)
+
+
+def iter_entries():
+    """Yield (ticker, text, summary) for every unexpired cache entry."""
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT ticker, text, summary FROM summaries WHERE created_at >= ?",
+            (time.time() - MAX_AGE_SECONDS,),
+        ).fetchall()
+    yield from rows
+
+
+def stats() -> dict:
+    """Return hit/miss counters for this process plus the current entry count."""
+    with _lock:
+        (size,) = _get_conn().execute("SELECT COUNT(*) FROM summaries").fetchone()
+        result = dict(_stats)
+    lookups = result["hits"] + result["misses"]
+    result["entries"] = size
+    result["hit_rate"] = result["hits"] / lookups if lookups else 0.0
+    return result
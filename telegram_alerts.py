@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-import requests
+import alert_dispatcher
 
 # Load environment variables from .env
 # dload_dotenv = load_dotenv()
@@ -9,7 +9,9 @@ load_dotenv()
 
 def send_telegram_message(text: str):
     """
-    Send a message via Telegram bot using credentials from environment variables.
+    Queue a message for the Telegram bot using credentials from environment variables.
+    Delivery happens on a background worker (see alert_dispatcher), so this returns
+    immediately without waiting on the Telegram API.
     """
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
@@ -17,18 +19,7 @@ def send_telegram_message(text: str):
         print("Telegram bot token or chat ID not set. Skipping sending message.")
         return
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "Markdown"
-    }
-
     try:
-        response = requests.post(url, data=payload)
-        if response.ok:
-            print(f"Telegram message sent: {response.status_code}")
-        else:
-            print(f"Failed to send Telegram message: {response.status_code} - {response.text}")
+        alert_dispatcher.enqueue(text, chat_id, parse_mode="Markdown")
     except Exception as e:
-        print(f"Error sending Telegram message: {e}") 
\ No newline at end of file
+        print(f"Error queueing Telegram message: {e}")
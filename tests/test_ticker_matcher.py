@@ -0,0 +1,20 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ticker_matcher import TickerMatcher
+
+
+def test_single_word_name_needs_capital():
+    matcher = TickerMatcher(["AAPL", "ORCL"], {"AAPL": "Apple Inc.", "ORCL": "Oracle Corporation"})
+    assert matcher.match("apple pie prices rose as the oracle predicted") == set()
+    assert matcher.match("Apple shares rose") == {"AAPL"}
+    assert matcher.match("ORACLE BEATS ESTIMATES") == {"ORCL"}
+
+
+def test_cashtags_and_multi_word_names_ignore_case():
+    matcher = TickerMatcher(["AAPL", "MSFT"], {"AAPL": "Apple Inc.", "MSFT": "Microsoft Corporation"})
+    assert matcher.match("buying $aapl today") == {"AAPL"}
+    assert matcher.match("apple inc. reported earnings") == {"AAPL"}
+    assert matcher.match("microsoft and apple") == set()
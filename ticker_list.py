@@ -0,0 +1,198 @@
+"""
+Write-through cache of the watchlist kept in the Google Sheet.
+
+The list lives in memory (shared by every Streamlit session in the process)
+and is persisted to tickers.csv, which also seeds it offline and is what
+batch_scan and the ingestion daemon read. Entries older than TICKER_LIST_TTL
+are served while a refresh from the sheet runs in the background, and a
+background job refreshes the list periodically. Adds go to the sheet and
+then straight into the cache and the file. The authorized worksheet is
+reused across calls instead of re-authorizing every time.
+"""
+import os
+import csv
+import time
+import threading
+
+TICKERS_PATH = os.getenv("TICKERS_PATH", "tickers.csv")
+TTL = float(os.getenv("TICKER_LIST_TTL", "300"))
+
+_lock = threading.Lock()
+_tickers = None
+_loaded_at = 0.0     # when the cached list was last known to match the sheet
+_file_mtime = None
+_client_factory = None
+_sheet_id = None
+_worksheet = None
+_refreshing = False
+_refresher = None
+# Bumped by every add; a sheet read that started before an add is discarded
+_generation = 0
+
+
+def configure(client_factory, sheet_id: str):
+    """Set the callable returning an authorized gspread client and the sheet to use."""
+    global _client_factory, _sheet_id, _worksheet
+    with _lock:
+        _client_factory = client_factory
+        if sheet_id != _sheet_id:
+            _sheet_id = sheet_id
+            _worksheet = None
+
+
+def _get_worksheet():
+    """The sheet's first worksheet, authorized once and reused. Must be called with _lock held."""
+    global _worksheet
+    if _worksheet is None:
+        if _client_factory is None or not _sheet_id:
+            raise RuntimeError("Ticker sheet is not configured")
+        _worksheet = _client_factory().open_by_key(_sheet_id).sheet1
+    return _worksheet
+
+
+def _clean(values) -> list:
+    """Upper-cased tickers in order, without blanks, duplicates or the header."""
+    tickers = []
+    for value in values:
+        t = (value or "").strip().upper()
+        if t and t != "TICKER" and t not in tickers:
+            tickers.append(t)
+    return tickers
+
+
+def _read_file():
+    """Load tickers.csv into the cache if it changed on disk. Must be called with _lock held."""
+    global _tickers, _loaded_at, _file_mtime
+    try:
+        mtime = os.path.getmtime(TICKERS_PATH)
+    except OSError:
+        if _tickers is None:
+            _tickers = []
+        return
+    if mtime == _file_mtime and _tickers is not None:
+        return
+    with open(TICKERS_PATH, newline='') as f:
+        _tickers = _clean(row[0] for row in csv.reader(f) if row)
+    _loaded_at = max(_loaded_at, mtime)
+    _file_mtime = mtime
+
+
+def _write_file(tickers):
+    """Persist the list atomically. Must be called with _lock held."""
+    global _file_mtime
+    tmp_path = f"{TICKERS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", newline='') as f:
+        csv.writer(f).writerows([t] for t in tickers)
+    os.replace(tmp_path, TICKERS_PATH)
+    _file_mtime = os.path.getmtime(TICKERS_PATH)
+
+
+def refresh() -> bool:
+    """
+    Re-read the sheet into the cache and tickers.csv. Returns False if the sheet
+    could not be read. A read overtaken by add_ticker() is dropped, leaving the
+    list stale so that the next call reads the sheet again.
+    """
+    global _tickers, _loaded_at, _worksheet
+    try:
+        with _lock:
+            worksheet = _get_worksheet()
+            generation = _generation
+        # Read outside the lock so sessions keep being served from the cache
+        values = worksheet.col_values(1)
+    except Exception as e:
+        with _lock:
+            # Authorize again next time in case the session went bad
+            _worksheet = None
+        print(f"Could not refresh tickers from the sheet: {e}")
+        return False
+    tickers = _clean(values[1:])
+    with _lock:
+        if generation != _generation:
+            # The sheet may have been read before the add landed
+            return True
+        if tickers != _tickers:
+            _write_file(tickers)
+        _tickers = tickers
+        _loaded_at = time.time()
+    return True
+
+
+def _refresh_in_background():
+    global _refreshing
+    try:
+        refresh()
+    finally:
+        _refreshing = False
+
+
+def get_tickers() -> list:
+    """
+    Return the watchlist. A stale list is returned as is while a background
+    refresh runs; only an empty cache waits for the sheet.
+    """
+    global _refreshing
+    with _lock:
+        _read_file()
+        tickers = list(_tickers)
+        stale = time.time() - _loaded_at > TTL
+        configured = _client_factory is not None
+        start = stale and configured and not _refreshing and bool(tickers)
+        if start:
+            _refreshing = True
+    if stale and configured and not tickers:
+        refresh()
+        with _lock:
+            return list(_tickers)
+    if start:
+        threading.Thread(target=_refresh_in_background, name="ticker-list-refresh", daemon=True).start()
+    return tickers
+
+
+def add_ticker(ticker: str) -> bool:
+    """
+    Add the ticker to the cache and tickers.csv, then append it to the sheet.
+    False if already listed. The sheet write runs outside the lock so readers
+    are not held up by it; if it fails the ticker is removed again.
+    """
+    global _tickers, _generation, _worksheet
+    ticker = ticker.strip().upper()
+    with _lock:
+        _read_file()
+        if ticker in _tickers:
+            return False
+        worksheet = _get_worksheet()
+        _generation += 1
+        _tickers = _tickers + [ticker]
+        _write_file(_tickers)
+    try:
+        worksheet.append_row([ticker])
+    except Exception:
+        with _lock:
+            _worksheet = None
+            if ticker in _tickers:
+                _generation += 1
+                _tickers = [t for t in _tickers if t != ticker]
+                _write_file(_tickers)
+        raise
+    with _lock:
+        # Drop refreshes that read the sheet before the append landed
+        _generation += 1
+    return True
+
+
+def _refresh_periodically(interval):
+    while True:
+        time.sleep(interval)
+        refresh()
+
+
+def start_refresher(interval: float = None):
+    """Start the background job that refreshes the list from the sheet, once per process."""
+    global _refresher
+    with _lock:
+        if _refresher is not None and _refresher.is_alive():
+            return
+        _refresher = threading.Thread(target=_refresh_periodically, args=(interval or TTL,),
+                                      name="ticker-list-refresher", daemon=True)
+        _refresher.start()
@@ -0,0 +1,139 @@
+"""
+Multi-pattern matcher that tags text with every watchlist ticker it mentions.
+
+All tickers, cashtags and company names are combined into one compiled regex
+alternation, so an article is scanned once no matter how many tickers are on
+the watchlist. Bare ticker symbols match case-sensitively (to avoid tagging
+ordinary words such as "now" or "hood"), and so do single-word company names,
+as written or in capitals ("Apple", "APPLE", but not "apple pie"); cashtags and
+multi-word company names match case-insensitively. Adding a ticker updates the term tables in place and the
+pattern is recompiled lazily on the next match.
+"""
+import re
+import csv
+import threading
+from ticker_metadata import cached_company_name
+
+# Corporate suffixes and generic descriptors stripped to get short forms of a name
+_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "plc", "llc", "lp", "sa", "nv", "ag", "holdings", "group", "technologies",
+    "technology", "markets", "platforms", "systems", "industries", "international",
+}
+
+
+def name_variants(company_name: str) -> set:
+    """Return the company name and its shorter forms without trailing corporate suffixes."""
+    name = " ".join((company_name or "").replace(",", " ").split())
+    if not name:
+        return set()
+    variants = {name.rstrip(".")}
+    words = name.split()
+    while len(words) > 1 and words[-1].lower().rstrip(".") in _SUFFIXES:
+        words = words[:-1]
+        short = " ".join(words).rstrip(".")
+        if len(short) >= 3:
+            variants.add(short)
+    return variants
+
+
+class TickerMatcher:
+    """Watchlist-wide matcher; match(text) returns the set of tickers mentioned."""
+
+    def __init__(self, tickers=(), names=None):
+        self._lock = threading.Lock()
+        self._symbols = {}   # exact symbol -> ticker
+        self._names = {}     # lower-case multi-word name / cashtag -> set of tickers
+        self._words = {}     # single-word name, as written and upper-cased -> set of tickers
+        self._company = {}   # ticker -> company name it was added with
+        self._pattern = None
+        # Bumped whenever the terms change, for caches of match() results
+        self.version = 0
+        names = names or {}
+        for ticker in tickers:
+            self.add_ticker(ticker, names.get(ticker, ""))
+
+    def __contains__(self, ticker):
+        return ticker.upper() in self._symbols
+
+    def add_ticker(self, ticker: str, company_name: str = ""):
+        """Add (or extend) a ticker's terms; the pattern is rebuilt on next use."""
+        ticker = ticker.upper().strip()
+        if not ticker:
+            return
+        with self._lock:
+            if ticker in self._symbols and self._company.get(ticker) == (company_name or ""):
+                return
+            self._symbols[ticker] = ticker
+            self._company[ticker] = company_name or ""
+            self._names.setdefault(f"${ticker.lower()}", set()).add(ticker)
+            for variant in name_variants(company_name):
+                if " " in variant:
+                    self._names.setdefault(variant.lower(), set()).add(ticker)
+                    continue
+                # A single word is often an ordinary one ("Apple", "Oracle"); only match it capitalized
+                for term in {variant, variant.upper()}:
+                    self._words.setdefault(term, set()).add(ticker)
+            self._pattern = None
+            self.version += 1
+
+    def update(self, tickers, names=None):
+        """Add any tickers not yet known (e.g. after the watchlist is reloaded)."""
+        names = names or {}
+        for ticker in tickers:
+            if ticker.upper().strip() not in self:
+                self.add_ticker(ticker, names.get(ticker) or cached_company_name(ticker))
+
+    def _compile(self):
+        def alternation(terms):
+            # Longest first so the regex prefers the most specific term
+            return "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+
+        parts = []
+        if self._names:
+            parts.append(f"(?i:(?<![\\w$])(?:{alternation(self._names)})(?!\\w))")
+        if self._symbols or self._words:
+            parts.append(f"(?<![\\w$])(?:{alternation(set(self._symbols) | set(self._words))})(?!\\w)")
+        return re.compile("|".join(parts)) if parts else None
+
+    def match(self, text: str) -> set:
+        """Return every watchlist ticker mentioned in text, in a single pass."""
+        with self._lock:
+            if self._pattern is None:
+                self._pattern = self._compile()
+            pattern, symbols, names, words = self._pattern, self._symbols, self._names, self._words
+        if pattern is None or not text:
+            return set()
+        found = set()
+        for m in pattern.finditer(text):
+            term = m.group(0)
+            if term in symbols:
+                found.add(symbols[term])
+            elif term in words:
+                found.update(words[term])
+            else:
+                found.update(names.get(term.lower(), ()))
+        return found
+
+
+def load_watchlist(path: str = "tickers.csv") -> list:
+    """Read tickers from a one-column CSV file."""
+    try:
+        with open(path, newline='') as f:
+            return [row[0].strip().upper() for row in csv.reader(f) if row and row[0].strip()]
+    except OSError:
+        return []
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> TickerMatcher:
+    """Process-wide matcher, seeded from tickers.csv and cached company names."""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            tickers = load_watchlist()
+            _matcher = TickerMatcher(tickers, {t: cached_company_name(t) for t in tickers})
+    return _matcher
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Persistent ticker -> company metadata cache so news fetches do not need a
+# yfinance .info round-trip every time.
+METADATA_PATH = os.getenv("TICKER_METADATA_PATH", "ticker_metadata.json")
+METADATA_TTL = float(os.getenv("TICKER_METADATA_TTL_DAYS", "30")) * 86400
+# Failed lookups are remembered for a shorter time before retrying
+FAILED_TTL = 86400
+
+_cache = None
+_lock = threading.Lock()
+
+
+def _load():
+    """Load the metadata file once per process. Must be called with _lock held."""
+    global _cache
+    if _cache is None:
+        try:
+            with open(METADATA_PATH) as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save():
+    """Write the cache atomically. Must be called with _lock held."""
+    tmp_path = f"{METADATA_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(_cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, METADATA_PATH)
+
+
+def _is_fresh(entry, now):
+    ttl = METADATA_TTL if entry.get("ok") else FAILED_TTL
+    return now - entry.get("fetched_at", 0) < ttl
+
+
+def _lookup(ticker: str) -> dict:
+    """Fetch metadata for one ticker from yfinance."""
+    import yfinance as yf
+    try:
+        info = yf.Ticker(ticker).info or {}
+    except Exception as e:
+        print(f"Ticker metadata lookup failed for {ticker}: {e}")
+        return {"ok": False, "fetched_at": time.time()}
+    return {
+        "ok": True,
+        "longName": info.get("longName") or "",
+        "shortName": info.get("shortName") or "",
+        "exchange": info.get("exchange") or "",
+        "fetched_at": time.time(),
+    }
+
+
+def get_metadata(ticker: str) -> dict:
+    """Return cached metadata for the ticker, looking it up if missing or expired."""
+    ticker = ticker.upper().strip()
+    now = time.time()
+    with _lock:
+        entry = _load().get(ticker)
+    if entry and _is_fresh(entry, now):
+        return entry
+    entry = _lookup(ticker)
+    with _lock:
+        _load()[ticker] = entry
+        _save()
+    return entry
+
+
+def get_company_name(ticker: str) -> str:
+    """Return the company's long name (or short name), or '' when unknown."""
+    entry = get_metadata(ticker)
+    return entry.get("longName") or entry.get("shortName") or ""
+
+
+def cached_company_name(ticker: str) -> str:
+    """Return the company name from the cache only (no network), or '' if unknown."""
+    with _lock:
+        entry = _load().get(ticker.upper().strip()) or {}
+    return entry.get("longName") or entry.get("shortName") or ""
+
+
+def warm_up(tickers, max_workers: int = 8) -> int:
+    """
+    Look up metadata for every ticker that is missing or expired, in parallel,
+    and persist the cache once. Returns the number of tickers fetched.
+    """
+    now = time.time()
+    with _lock:
+        cache = _load()
+        stale = sorted({t.upper().strip() for t in tickers
+                        if not (cache.get(t.upper().strip()) and _is_fresh(cache[t.upper().strip()], now))})
+    if not stale:
+        return 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        entries = list(pool.map(_lookup, stale))
+    with _lock:
+        cache = _load()
+        cache.update(zip(stale, entries))
+        _save()
+    return len(stale)